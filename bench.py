@@ -0,0 +1,810 @@
+#!/usr/bin/env python3
+"""
+ホットペッパービューティー NEW OPEN 美容室監視 ベンチマーク
+- 保存済みHTML（fixtures/list, fixtures/tel）または疑似ページで解析処理を計測
+- ローカルのスタンドインサーバ（一覧/電話番号/Chatwork/Sheets）で取得〜通知までを計測
+- 結果をJSONで出力（コミット間で比較できる形式）
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import random
+import re
+import resource
+import shutil
+import subprocess
+import tempfile
+import threading
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+import main
+
+# ============================================
+# 設定
+# ============================================
+
+FIXTURE_DIR = "fixtures"
+GOLDEN_FILE = "expected.json"  # フィクスチャの期待値（--record 時に bs4 の結果から作る）
+SYNTHETIC_PAGES = 5  # 疑似ページ生成時のエリアあたりページ数
+SYNTHETIC_PER_PAGE = 20  # 疑似ページ1枚あたりの店舗数
+
+
+# ============================================
+# フィクスチャ
+# ============================================
+
+def make_salon_ids(area_code: str, page: int, per_page: int = SYNTHETIC_PER_PAGE) -> List[str]:
+    """疑似一覧ページに載せる店舗IDを生成"""
+    area_no = list(main.AREAS).index(area_code) if area_code in main.AREAS else 0
+    return [f"slnH{area_no * 10000000 + page * 1000 + i:09d}" for i in range(per_page)]
+
+
+def make_list_page(area_code: str, page: int, total: int, salon_ids: Optional[List[str]] = None) -> str:
+    """NEW OPEN一覧ページを模したHTMLを生成"""
+    if salon_ids is None:
+        salon_ids = make_salon_ids(area_code, page)
+    items = []
+    for i, salon_id in enumerate(salon_ids):
+        items.append(
+            f'<li class="searchListCassette">\n'
+            f'  <div class="slnCassetteHeader"><h3 class="slnName">'
+            f'<a href="https://beauty.hotpepper.jp/{salon_id}/">HAIR &amp; MAKE {area_code} {salon_id[-6:]}\n   店</a></h3></div>\n'
+            f'  <div class="slnTopImg"><a href="https://beauty.hotpepper.jp/{salon_id}/"><img src="/img/{salon_id}.jpg" alt=""></a></div>\n'
+            f'  <p class="slnCatch">駅徒歩{i % 10 + 1}分・{page}月NEW OPEN</p>\n'
+            f'  <ul class="slnLinks"><li><a href="https://beauty.hotpepper.jp/{salon_id}/coupon/">クーポン</a></li>'
+            f'<li><a href="https://beauty.hotpepper.jp/{salon_id}/tel/">電話番号</a></li></ul>\n'
+            f'</li>'
+        )
+    next_link = f'<a href="/{area_code}/{main.NEW_OPEN_PATH}PN{page + 1}.html">次へ</a>' if page < total else ""
+    return (
+        '<!DOCTYPE html>\n<html lang="ja"><head><meta charset="utf-8"><title>NEW OPEN</title>'
+        '<script>var tel = "03-0000-0000";</script></head><body>\n'
+        '<div id="header"><a href="/">ホットペッパービューティー</a></div>\n'
+        f'<ul class="slnCassetteList">\n' + "\n".join(items) + '\n</ul>\n'
+        f'<div class="preListHead"><p class="pa bottom0 taR">{page}/{total}ページ</p>{next_link}</div>\n'
+        '</body></html>\n'
+    )
+
+
+def synthetic_list_pages() -> Dict[str, str]:
+    """全エリア分の疑似一覧ページを生成"""
+    pages = {}
+    for area_code in main.AREAS:
+        for page in range(1, SYNTHETIC_PAGES + 1):
+            pages[f"{area_code}_PN{page}.html"] = make_list_page(area_code, page, SYNTHETIC_PAGES)
+    return pages
+
+
+def load_list_pages(fixture_dir: str) -> Dict[str, str]:
+    """保存済みの一覧ページを読み込み（なければ疑似ページ）"""
+    paths = sorted(glob.glob(os.path.join(fixture_dir, "list", "*.html")))
+    if not paths:
+        return synthetic_list_pages()
+    pages = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def record_fixtures(fixture_dir: str, max_pages: int, max_tel: int):
+    """実サイトから一覧ページと電話番号ページを取得してフィクスチャとして保存"""
+    os.makedirs(os.path.join(fixture_dir, "list"), exist_ok=True)
+    os.makedirs(os.path.join(fixture_dir, "tel"), exist_ok=True)
+    tel_urls = {}
+    for genre_info in main.GENRES.values():
+        for area_code in main.AREAS:
+            for page in range(1, max_pages + 1):
+                html = main.fetch_page(main.get_new_open_url(genre_info["prefix"], area_code, page))
+                if not html:
+                    break
+                save_fixture(os.path.join(fixture_dir, "list", f"{area_code}_PN{page}.html"), html)
+                for salon in main.extract_salons(html):
+                    tel_urls.setdefault(salon.id, salon.tel_url)
+
+    for salon_id, tel_url in list(tel_urls.items())[:max_tel]:
+        html = main.fetch_page(tel_url)
+        if html:
+            save_fixture(os.path.join(fixture_dir, "tel", f"{salon_id}.html"), html)
+    write_golden(fixture_dir)
+
+
+# 保存前に取り除く部分（計測・広告のスクリプト、埋め込み、コメント。解析対象の要素は残す）
+SANITIZE_PATTERN = re.compile(
+    r'<(script|noscript|style|iframe)\b[^>]*>.*?</\1\s*>|<!--.*?-->|<input\b[^>]*type="hidden"[^>]*>', re.S | re.I
+)
+BLANK_LINES_PATTERN = re.compile(r'\n\s*\n+')
+
+
+def sanitize_fixture(html: str) -> str:
+    """コミットできるように、スクリプト・埋め込み・コメント・hidden の値を取り除く"""
+    return BLANK_LINES_PATTERN.sub("\n", SANITIZE_PATTERN.sub("", html))
+
+
+def save_fixture(path: str, html: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(sanitize_fixture(html))
+    print(f"[SAVE] {path}")
+
+
+def golden_results(list_pages: Dict[str, str], tel_pages: Dict[str, str], backend: str = "bs4") -> Dict:
+    """フィクスチャの解析結果（expected.json 形式）"""
+    lists = {}
+    for name, html in list_pages.items():
+        analysis = main.PARSER_BACKENDS[backend](html, page_number(name))
+        lists[name] = {
+            "total_pages": analysis.total_pages,
+            "has_next": analysis.has_next,
+            "salons": [[salon.id, salon.name] for salon in analysis.salons],
+        }
+    return {"list": lists, "tel": {name: main.extract_phone_number(html) for name, html in tel_pages.items()}}
+
+
+def write_golden(fixture_dir: str):
+    """保存済みフィクスチャの期待値を bs4 の結果で書き出す（差分は目視で確認してからコミットする）"""
+    path = os.path.join(fixture_dir, GOLDEN_FILE)
+    golden = golden_results(load_list_pages(fixture_dir), load_tel_pages(fixture_dir))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(golden, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    print(f"[SAVE] {path}")
+
+
+# 電話番号ページのバリエーション（本文部分）
+TEL_PAGE_BODIES = {
+    "td_fs16": '<table class="telTable"><tr><th>電話番号</th><td class="fs16 b">045-594-9284</td></tr></table>',
+    "td_nested": '<table><tr><th>電話番号</th><td class="fs16 b">\n  <span>03</span>-<span>1234</span>-5678 </td></tr></table>',
+    "td_entity": '<table><tr><td class="w80 fs16 b">06&#45;6123&#45;4567</td></tr></table>',
+    "td_not_phone": '<table><tr><td class="tbl">お問い合わせ</td></tr></table><a href="tel:0120-000-111">電話する</a>',
+    "tel_link": '<p>お電話はこちら</p><a class="telBtn" href="tel:092-111-2222">発信</a>',
+    "tel_link_single_quote": "<a href='tel:011-222-3333'>発信</a>",
+    "text_fullwidth": '<div class="telInfo">TEL：<strong>052ー123ー4567</strong>（受付 10:00〜19:00）</div>',
+    "text_split_tags": '<p>電話 <b>098</b>-765-4321</p>',
+    "script_decoy": '<script>var dummy = "03-0000-0000";</script><!-- 06-0000-0000 --><p>電話番号は 075‐111‐2222 です</p>',
+    "no_phone": '<p>この店舗は電話予約を受け付けていません</p>',
+}
+
+
+def make_tel_page(body: str) -> str:
+    """電話番号ページを模したHTMLを生成（実ページ同様に周辺要素で嵩増し）"""
+    filler = "\n".join(
+        f'<li class="menuItem"><a href="/slnH{i:09d}/">関連サロン {i}</a><span class="b">★{i % 5}</span></li>'
+        for i in range(200)
+    )
+    return (
+        '<!DOCTYPE html>\n<html lang="ja"><head><meta charset="utf-8"><title>電話番号 | ホットペッパービューティー</title>'
+        '<script>window.dataLayer = [{"page": "tel"}];</script></head><body>\n'
+        f'<div id="mainContents">{body}</div>\n<ul class="recommend">{filler}</ul>\n</body></html>\n'
+    )
+
+
+def load_tel_pages(fixture_dir: str) -> Dict[str, str]:
+    """保存済みの電話番号ページを読み込み（なければ疑似ページ）"""
+    paths = sorted(glob.glob(os.path.join(fixture_dir, "tel", "*.html")))
+    if not paths:
+        return {name: make_tel_page(body) for name, body in TEL_PAGE_BODIES.items()}
+    pages = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def page_number(name: str) -> int:
+    """フィクスチャ名（svcSA_PN3.html）からページ番号を取得"""
+    return int(name.rsplit("PN", 1)[1].split(".")[0])
+
+
+# ============================================
+# 計測
+# ============================================
+
+class ParseCounter:
+    """main.BeautifulSoup の生成回数を数える"""
+
+    def __init__(self):
+        self.count = 0
+        self.original = main.BeautifulSoup
+
+    def __enter__(self):
+        counter = self
+
+        class CountingSoup(BeautifulSoup):
+            def __init__(self, *args, **kwargs):
+                counter.count += 1
+                super().__init__(*args, **kwargs)
+
+        main.BeautifulSoup = CountingSoup
+        return self
+
+    def __exit__(self, *exc):
+        main.BeautifulSoup = self.original
+
+
+def measure(func: Callable, pages: Dict[str, str], repeat: int) -> Dict:
+    """全ページに func を repeat 回適用して CPU 時間とパース回数を計測"""
+    with ParseCounter() as counter:
+        start = time.process_time()
+        for _ in range(repeat):
+            for name, html in pages.items():
+                func(html, page_number(name))
+        cpu = time.process_time() - start
+    calls = repeat * len(pages)
+    return {
+        "pages": calls,
+        "parses": counter.count,
+        "parses_per_page": counter.count / calls,
+        "cpu_sec": round(cpu, 4),
+        "ms_per_page": round(cpu / calls * 1000, 3),
+    }
+
+
+def legacy_page(html: str, page: int):
+    """従来の scan_category と同じ呼び出し（ページごとに3回パース）"""
+    main.get_total_pages(html)
+    main.extract_salons(html)
+    main.has_next_page(html, page)
+
+
+def available_backends() -> List[str]:
+    """インストール済みのパーサ一覧"""
+    return ["bs4"] + [backend for backend in ("lxml", "selectolax") if main.load_parser(backend)]
+
+
+def bench_parse(pages: Dict[str, str], repeat: int) -> Dict:
+    """一覧ページ解析: 従来の3回パース vs パーサごとの analyze_page"""
+    legacy = measure(legacy_page, pages, repeat)
+    results = {"legacy": legacy, "default_backend": main.get_parser_backend()}
+    for backend in available_backends():
+        result = measure(main.PARSER_BACKENDS[backend], pages, repeat)
+        if result["cpu_sec"]:
+            result["speedup"] = round(legacy["cpu_sec"] / result["cpu_sec"], 2)
+        results[backend] = result
+    return results
+
+
+def verify_backends(pages: Dict[str, str]) -> List[str]:
+    """各パーサの解析結果が BeautifulSoup 版（基準）と一致するか検証"""
+    errors = []
+    for name, html in pages.items():
+        page = page_number(name)
+        expected = main.PARSER_BACKENDS["bs4"](html, page)
+        for backend in available_backends():
+            actual = main.PARSER_BACKENDS[backend](html, page)
+            if actual != expected:
+                errors.append(f"{backend}: {name}")
+    return errors
+
+
+def verify_golden(fixture_dir: str) -> List[str]:
+    """コミット済みフィクスチャの期待値（expected.json）と全パーサ・電話番号抽出の結果を比較"""
+    path = os.path.join(fixture_dir, GOLDEN_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    list_pages = load_list_pages(fixture_dir)
+    tel_pages = load_tel_pages(fixture_dir)
+    errors = [f"golden: {name} のフィクスチャがありません" for name in expected["list"].keys() - list_pages.keys()]
+    errors += [f"golden: {name} のフィクスチャがありません" for name in expected["tel"].keys() - tel_pages.keys()]
+    for backend in available_backends():
+        actual = golden_results(list_pages, tel_pages, backend)
+        for name, result in actual["list"].items():
+            if expected["list"].get(name) != result:
+                errors.append(f"golden: {backend}: {name}")
+    for name, phone in actual["tel"].items():
+        if expected["tel"].get(name) != phone:
+            errors.append(f"golden: phone: {name} ({phone!r} != {expected['tel'].get(name)!r})")
+    return errors
+
+
+def bench_state(count: int) -> Dict:
+    """既知店舗の保存形式: JSON（indent=2）vs バイナリスナップショット"""
+    rng = random.Random(0)
+    numbers = sorted(rng.sample(range(100000000, 999999999), count))
+    data = {f"hair_{area_code}": [] for area_code in main.AREAS}
+    keys = list(data)
+    for number in numbers:
+        data[rng.choice(keys)].append(main.salon_id_from_number(number))
+    index = main.SalonIndex.from_dict(data)
+
+    results = {"salons": count}
+    workdir = tempfile.mkdtemp(prefix="hotpepper-bench-")
+    try:
+        json_path = os.path.join(workdir, "known_salons.json")
+        snapshot_path = os.path.join(workdir, "known_salons.bin")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(index.to_dict(), f, ensure_ascii=False, indent=2)
+        main.write_snapshot(snapshot_path, index)
+
+        for label, path in (("json", json_path), ("snapshot", snapshot_path)):
+            start = time.perf_counter()
+            loaded = main.read_snapshot(path)
+            elapsed = time.perf_counter() - start
+            assert len(loaded) == count
+            results[label] = {"bytes": os.path.getsize(path), "load_ms": round(elapsed * 1000, 1)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    results["size_ratio"] = round(results["json"]["bytes"] / results["snapshot"]["bytes"], 1)
+    return results
+
+
+def legacy_extract_phone_number(html: str) -> str:
+    """従来の電話番号抽出（BeautifulSoup で全体をパース、最後は get_text() 全文走査）"""
+    soup = BeautifulSoup(html, "html.parser")
+
+    td = soup.find("td", class_=re.compile(r"fs16|b"))
+    if td:
+        phone = td.get_text(strip=True)
+        if re.match(r'[\d\-]+', phone):
+            return phone
+
+    tel_link = soup.find("a", href=re.compile(r"tel:"))
+    if tel_link:
+        phone = tel_link.get("href", "").replace("tel:", "")
+        return phone
+
+    text = soup.get_text()
+    phone_match = re.search(r'(\d{2,4}[-‐ー]\d{2,4}[-‐ー]\d{3,4})', text)
+    if phone_match:
+        return phone_match.group(1)
+
+    return ""
+
+
+def bench_phone(pages: Dict[str, str], repeat: int) -> Dict:
+    """電話番号抽出: 従来の BeautifulSoup 版 vs extract_phone_number"""
+    results = {}
+    for label, func in (("legacy", legacy_extract_phone_number), ("extract_phone_number", main.extract_phone_number)):
+        start = time.process_time()
+        for _ in range(repeat):
+            for html in pages.values():
+                func(html)
+        cpu = time.process_time() - start
+        calls = repeat * len(pages)
+        results[label] = {"pages": calls, "cpu_sec": round(cpu, 4), "ms_per_page": round(cpu / calls * 1000, 3)}
+    if results["extract_phone_number"]["cpu_sec"]:
+        results["speedup"] = round(results["legacy"]["cpu_sec"] / results["extract_phone_number"]["cpu_sec"], 2)
+    return results
+
+
+def verify_phone(pages: Dict[str, str]) -> List[str]:
+    """extract_phone_number が従来版（ハイフン等の正規化後）と一致するか検証"""
+    errors = []
+    for name, html in pages.items():
+        expected = main.normalize_phone_number(legacy_extract_phone_number(html))
+        actual = main.extract_phone_number(html)
+        if actual != expected:
+            errors.append(f"phone: {name} ({actual!r} != {expected!r})")
+    return errors
+
+
+# ============================================
+# スタンドインサーバ（ホットペッパー / Chatwork / Sheets の代役）
+# ============================================
+
+class StandInServer:
+    """一覧ページ・電話番号ページ・Chatwork・Sheets風APIを返すローカルHTTPサーバ"""
+
+    def __init__(self, pages: int, per_page: int, latency: float, error_rate: float, seed: int = 0,
+                 chatwork_limit: int = 300, chatwork_window: float = 300.0):
+        self.pages = pages
+        self.per_page = per_page
+        self.latency = latency
+        self.error_rate = error_rate
+        self.chatwork_limit = chatwork_limit
+        self.chatwork_window = chatwork_window
+        self.chatwork_posts: List[float] = []
+        self.rate_limited = 0
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.published: Dict[str, List[str]] = {area_code: [] for area_code in main.AREAS}
+        self.published_at: Dict[str, float] = {}
+        self.messages: List[Dict] = []
+        self.sheet_rows: List[List[str]] = [list(main.SHEET_HEADERS)]  # StandInWorksheet の中身（1行目はヘッダー）
+        self.requests = 0
+        self.errors = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.make_handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def publish(self, area_code: str, count: int) -> List[str]:
+        """新規店舗を一覧の先頭に追加（掲載時刻を記録）"""
+        area_no = list(main.AREAS).index(area_code)
+        with self.lock:
+            start = len(self.published[area_code])
+            salon_ids = [f"slnH{900000000 + area_no * 100000 + start + i:09d}" for i in range(count)]
+            self.published[area_code] = salon_ids[::-1] + self.published[area_code]
+            now = time.time()
+            for salon_id in salon_ids:
+                self.published_at[salon_id] = now
+        return salon_ids
+
+    def list_ids(self, area_code: str) -> List[str]:
+        with self.lock:
+            published = list(self.published[area_code])
+        base = [salon_id for page in range(1, self.pages + 1) for salon_id in make_salon_ids(area_code, page, self.per_page)]
+        return published + base
+
+    def chatwork_quota(self, now: float):
+        """Chatwork API のレート制限を模擬（ウィンドウ内の上限を超えたら429。lock 内で呼ぶ）"""
+        self.chatwork_posts = [t for t in self.chatwork_posts if t > now - self.chatwork_window]
+        if len(self.chatwork_posts) < self.chatwork_limit:
+            self.chatwork_posts.append(now)
+            status = 200
+        else:
+            self.rate_limited += 1
+            status = 429
+        reset = int(self.chatwork_posts[0] + self.chatwork_window) + 1
+        return status, {
+            "X-RateLimit-Limit": str(self.chatwork_limit),
+            "X-RateLimit-Remaining": str(self.chatwork_limit - len(self.chatwork_posts)),
+            "X-RateLimit-Reset": str(reset),
+        }
+
+    def make_handler(self):
+        server = self
+        list_pattern = re.compile(rf"^/(\w+)/{re.escape(main.NEW_OPEN_PATH)}(?:PN(\d+)\.html)?$")
+        tel_pattern = re.compile(r"^/(slnH\d+)/tel/$")
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if not self.begin():
+                    return
+                match = list_pattern.match(self.path)
+                if match and match.group(1) in main.AREAS:
+                    ids = server.list_ids(match.group(1))
+                    page = int(match.group(2) or 1)
+                    total = max(1, -(-len(ids) // server.per_page))
+                    if page > total:
+                        return self.reply(404, "")
+                    chunk = ids[(page - 1) * server.per_page:page * server.per_page]
+                    return self.reply(200, make_list_page(match.group(1), page, total, chunk))
+                match = tel_pattern.match(self.path)
+                if match:
+                    number = int(match.group(1)[4:])
+                    phone = f"0{number % 9 + 1}-{number % 9000 + 1000}-{number % 10000:04d}"
+                    return self.reply(200, make_tel_page(f'<table><tr><td class="fs16 b">{phone}</td></tr></table>'))
+                self.reply(404, "")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode("utf-8")
+                if not self.begin():
+                    return
+                received = time.time()
+                with server.lock:
+                    if self.path.startswith("/v2/rooms/"):
+                        status, headers = server.chatwork_quota(received)
+                        if status == 200:
+                            server.messages.append({"time": received, "body": parse_qs(body).get("body", [""])[0]})
+                        return self.reply(status, "{}", headers)
+                    elif self.path == "/sheets/append":
+                        server.sheet_rows.extend(json.loads(body)["rows"])
+                    else:
+                        return self.reply(404, "")
+                self.reply(200, "{}")
+
+            def begin(self) -> bool:
+                """遅延とエラー注入（False なら 503 を返済み）"""
+                time.sleep(server.latency)
+                with server.lock:
+                    server.requests += 1
+                    failed = server.random.random() < server.error_rate
+                    if failed:
+                        server.errors += 1
+                if failed:
+                    self.reply(503, "")
+                return not failed
+
+            def reply(self, status: int, body: str, headers: Optional[Dict[str, str]] = None):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class StandInWorksheet:
+    """gspread の Worksheet の代わりにスタンドインサーバの sheet_rows を読み書きする
+
+    SheetsSink が使う append_rows / col_values / batch_get だけを持つ。追加は HTTP で送り、
+    エラー応答は gspread の APIError にして SheetsSink の再試行をそのまま通す。
+    """
+
+    def __init__(self, server: StandInServer):
+        self.server = server
+
+    def append_rows(self, rows: List[List[str]]):
+        response = main.get_http_client().post(f"{self.server.url}/sheets/append", json={"rows": rows})
+        if not response.ok:
+            import gspread
+            raise gspread.exceptions.APIError(response)
+
+    def col_values(self, col: int) -> List[str]:
+        with self.server.lock:
+            return [row[col - 1] if len(row) >= col else "" for row in self.server.sheet_rows]
+
+    def batch_get(self, ranges: List[str]) -> List[List[List[str]]]:
+        """A列の範囲（"A5" / "A6:A" の形式）だけ対応"""
+        column = self.col_values(1)
+        result = []
+        for cell_range in ranges:
+            start, _, end = cell_range.partition(":")
+            first = int(start[1:]) - 1
+            result.append([[value] for value in (column[first:] if end else column[first:first + 1])])
+        return result
+
+
+def point_main_at(server: StandInServer, rate: float):
+    """main の接続先・レート・Sheets 書き込みをスタンドインサーバに向ける"""
+    main.BASE_URL = server.url
+    main.CHATWORK_API_BASE = f"{server.url}/v2"
+    main.REQUEST_RATE = rate
+    main.RETRY_BACKOFF = 0.05
+    main.SCAN_SCHEDULER = "all"  # 検知までの時間を測るため、直前にスキャンしたエリアも毎回見る
+    main._http_client = None
+    main._page_cache = None
+    main._phone_cache = None
+    # SheetsSink（A列ミラー・重複除外・再試行）はそのまま使い、ワークシートだけ差し替える
+    main.SHEET_RETRY_BACKOFF = 0.05
+    main._sheets_sink = main.SheetsSink()
+    main._sheets_sink.worksheet = StandInWorksheet(server)
+
+
+def peak_rss_mb() -> float:
+    """プロセスの最大RSS（MB）"""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def timed(server: StandInServer, func: Callable, *args):
+    """func を実行して経過時間・リクエスト数を計測（標準出力は捨てる）"""
+    before = server.requests
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = func(*args)
+    elapsed = time.perf_counter() - start
+    requests_made = server.requests - before
+    return result, {
+        "sec": round(elapsed, 3),
+        "requests": requests_made,
+        "requests_per_sec": round(requests_made / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_e2e(args) -> Dict:
+    """スタンドインサーバに対して scan_all_categories / get_phone_number / main() を計測"""
+    results = {
+        "config": {
+            "pages": args.e2e_pages, "per_page": SYNTHETIC_PER_PAGE, "latency": args.latency,
+            "error_rate": args.error_rate, "rate": args.rate,
+            "publish": args.e2e_publish, "chatwork_limit": args.chatwork_limit,
+        },
+    }
+    workdir = tempfile.mkdtemp(prefix="hotpepper-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with StandInServer(args.e2e_pages, SYNTHETIC_PER_PAGE, args.latency, args.error_rate,
+                           chatwork_limit=args.chatwork_limit, chatwork_window=args.chatwork_window) as server:
+            point_main_at(server, args.rate)
+
+            current, results["scan_all_categories"] = timed(server, main.scan_all_categories)
+            results["scan_all_categories"]["salons"] = sum(len(s) for s in current.values())
+
+            salons = [salon for area in current.values() for salon in area][:50]
+            _, results["get_phone_number"] = timed(server, lambda: [main.get_phone_number(s.tel_url) for s in salons])
+            results["get_phone_number"]["ms_per_salon"] = round(results["get_phone_number"]["sec"] / len(salons) * 1000, 2)
+
+            # 初回実行（全店舗を登録）→ 新規掲載 → 2回目の実行で検知までの時間を計測
+            main._http_client = None
+            _, results["main_first_run"] = timed(server, main.main)
+            new_ids = [salon_id for area_code in main.AREAS for salon_id in server.publish(area_code, args.e2e_publish)]
+            notified_before = len(server.messages)
+            _, results["main_detect_run"] = timed(server, main.main)
+
+            latencies = []
+            for salon_id in new_ids:
+                hit = next((m for m in server.messages[notified_before:] if salon_id in m["body"]), None)
+                if hit:
+                    latencies.append(hit["time"] - server.published_at[salon_id])
+            results["detection"] = {
+                "published": len(new_ids),
+                "notified": len(latencies),
+                "latency_sec_max": round(max(latencies), 3) if latencies else None,
+                "latency_sec_mean": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            }
+            results["detection"]["chatwork_messages"] = len(server.messages) - notified_before
+            # 2回目の実行の計測値（main が METRICS_FILE に追記した最終行。遅い処理のトレースは除く）
+            with open(main.METRICS_FILE, encoding="utf-8") as f:
+                report = json.loads(f.readlines()[-1])
+            results["detect_run_metrics"] = {key: report[key] for key in ("pipeline", "counters", "durations")}
+            sheet_ids = [row[0] for row in server.sheet_rows[1:]]
+            results["server"] = {"requests": server.requests, "injected_errors": server.errors,
+                                 "chatwork_429": server.rate_limited, "sheet_rows": len(sheet_ids),
+                                 "sheet_duplicates": len(sheet_ids) - len(set(sheet_ids))}
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def bench_profile(args):
+    """スタンドインサーバに対して main をプロファイル（初回で全店舗を登録 → 新規掲載 → 全件スキャンの回を計測）"""
+    profile_dir = os.path.abspath(args.profile_dir)
+    workdir = tempfile.mkdtemp(prefix="hotpepper-profile-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with StandInServer(args.e2e_pages, SYNTHETIC_PER_PAGE, args.latency, args.error_rate) as server:
+            point_main_at(server, args.rate)
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                main.main()
+            for area_code in main.AREAS:
+                server.publish(area_code, args.e2e_publish)
+            main.SCAN_MODE = "full"
+            main.PROFILE_DIR = profile_dir
+            main.run_profile()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ============================================
+# 起動時間
+# ============================================
+
+# main の import 時に読み込まれてはいけないモジュール（使うときに読み込む）
+STARTUP_LAZY_MODULES = ("bs4", "lxml", "selectolax", "gspread", "google.oauth2", "google.auth")
+
+
+def import_times(repeat: int) -> Dict:
+    """python -X importtime -c "import main" を repeat 回実行して main の累積読み込み時間と読み込まれたモジュールを取得"""
+    samples = []
+    modules = set()
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+        for line in proc.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            parts = line.split("|")
+            if len(parts) != 3 or not parts[1].strip().isdigit():
+                continue
+            name = parts[2].strip()
+            modules.add(name)
+            if name == "main":
+                samples.append(int(parts[1]) / 1000)
+    samples.sort()
+    return {"samples": samples, "modules": modules}
+
+
+def bench_startup(repeat: int, budget_ms: float) -> Dict:
+    """main の import 時間と、遅延読み込みすべきモジュールが読み込まれていないかを確認"""
+    measured = import_times(repeat)
+    eager = sorted(
+        name for name in measured["modules"]
+        if any(name == module or name.startswith(module + ".") for module in STARTUP_LAZY_MODULES)
+    )
+    import_ms = measured["samples"][0]
+    return {
+        "import_ms_min": round(import_ms, 1),
+        "import_ms_median": round(measured["samples"][len(measured["samples"]) // 2], 1),
+        "budget_ms": budget_ms,
+        "eager_imports": eager,
+        "ok": not eager and import_ms <= budget_ms,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+# ============================================
+# メイン処理
+# ============================================
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="ホットペッパー監視 ベンチマーク")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="保存済みHTMLのディレクトリ")
+    parser.add_argument("--record", action="store_true", help="実サイトからフィクスチャを保存して終了")
+    parser.add_argument("--record-pages", type=int, default=3, help="保存するエリアあたりの一覧ページ数")
+    parser.add_argument("--record-tel", type=int, default=30, help="保存する電話番号ページ数")
+    parser.add_argument("--verify", action="store_true", help="各パーサの結果が一致するか検証して終了")
+    parser.add_argument("--repeat", type=int, default=3, help="計測の繰り返し回数")
+    parser.add_argument("--state-salons", type=int, default=100000, help="保存形式の計測に使う店舗数")
+    parser.add_argument("--e2e", action="store_true", help="スタンドインサーバに対して取得〜通知までを計測")
+    parser.add_argument("--e2e-pages", type=int, default=3, help="スタンドインサーバのエリアあたりページ数")
+    parser.add_argument("--latency", type=float, default=0.05, help="スタンドインサーバの応答遅延（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="スタンドインサーバが503を返す割合")
+    parser.add_argument("--e2e-publish", type=int, default=2, help="2回目の実行前にエリアごとに掲載する新規店舗数")
+    parser.add_argument("--chatwork-limit", type=int, default=300, help="スタンドインのChatwork APIの投稿上限（ウィンドウあたり）")
+    parser.add_argument("--chatwork-window", type=float, default=300.0, help="スタンドインのChatwork APIのレート制限ウィンドウ（秒）")
+    parser.add_argument("--rate", type=float, default=50.0, help="計測時の REQUEST_RATE")
+    parser.add_argument("--profile", action="store_true", help="スタンドインサーバに対して main をプロファイルして終了（--e2e-* の設定を使用）")
+    parser.add_argument("--profile-dir", default="profile", help="プロファイル結果の出力先")
+    parser.add_argument("--startup", action="store_true", help="main の import 時間と遅延読み込みを確認して終了（違反があれば終了コード1）")
+    parser.add_argument("--startup-budget-ms", type=float, default=250.0, help="main の import 時間の上限（ミリ秒）")
+    parser.add_argument("--output", help="結果JSONの保存先")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.fixtures, args.record_pages, args.record_tel)
+        return
+
+    if args.profile:
+        bench_profile(args)
+        return
+
+    if args.startup:
+        startup = bench_startup(max(args.repeat, 5), args.startup_budget_ms)
+        for module in startup["eager_imports"]:
+            print(f"[NG] import main で {module} が読み込まれています")
+        print(f"[{'OK' if startup['ok'] else 'NG'}] import main: {startup['import_ms_min']}ms（上限 {startup['budget_ms']:g}ms）")
+        raise SystemExit(0 if startup["ok"] else 1)
+
+    pages = load_list_pages(args.fixtures)
+    tel_pages = load_tel_pages(args.fixtures)
+    if args.verify:
+        errors = verify_backends(pages) + verify_phone(tel_pages) + verify_golden(args.fixtures)
+        for error in errors:
+            print(f"[NG] {error}")
+        golden = "（expected.json と照合）" if os.path.exists(os.path.join(args.fixtures, GOLDEN_FILE)) else ""
+        print(f"[{'NG' if errors else 'OK'}] 一覧 {len(pages)}ページ × {', '.join(available_backends())} / 電話番号 {len(tel_pages)}ページ{golden}")
+        raise SystemExit(1 if errors else 0)
+
+    results: Dict = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fixture_pages": len(pages),
+    }
+    results["parse"] = bench_parse(pages, args.repeat)
+    results["phone"] = bench_phone(tel_pages, args.repeat * 10)
+    results["state"] = bench_state(args.state_salons)
+    results["startup"] = bench_startup(args.repeat, args.startup_budget_ms)
+    if args.e2e:
+        results["e2e"] = bench_e2e(args)
+
+    report = json.dumps(results, ensure_ascii=False, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -7,16 +7,38 @@
 """
 
 import requests
-from bs4 import BeautifulSoup
+import requests.adapters
+import urllib3.exceptions
+import contextlib
+import gzip
+import hashlib
 import json
 import os
+import queue
+import random
+import threading
 import time
 import re
+import signal
+import sqlite3
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from datetime import datetime
-from typing import Dict, List, Set, Optional
+from html import unescape
+from itertools import accumulate, chain
+from typing import Callable, Container, Dict, Iterable, Iterator, List, Set, Optional, Tuple, Union
+from urllib.parse import urlsplit
 
-import gspread
-from google.oauth2.service_account import Credentials
+# パーサ（bs4 / 任意の selectolax・lxml）と gspread・Google認証は使うときに読み込む
+# （新規店舗がない回は Sheets まわりを一切読み込まずに終わる。load_parser / get_sheets_client）
+BeautifulSoup = None
+LexborHTMLParser = None
+lxml = None
 
 # ============================================
 # 設定
@@ -24,20 +46,95 @@ from google.oauth2.service_account import Credentials
 
 CHATWORK_API_TOKEN = os.environ.get("CHATWORK_API_TOKEN", "07a5b6d533a6ef46e8f1e29ed1f97691")
 CHATWORK_ROOM_ID = os.environ.get("CHATWORK_ROOM_ID", "418568359")
+CHATWORK_API_BASE = os.environ.get("CHATWORK_API_BASE", "https://api.chatwork.com/v2")
+CHATWORK_MAX_BODY_CHARS = int(os.environ.get("CHATWORK_MAX_BODY_CHARS", "10000"))  # 1通の最大文字数（超えたら分割）
+# 同一ルームへの投稿ペース（10秒間に10通までの制限。どの10秒間でも BURST + RATE×10 通を超えない）
+CHATWORK_MESSAGE_RATE = 0.5
+CHATWORK_MESSAGE_BURST = 5
 
 # Google Sheets設定
 CREDENTIALS_FILE = os.environ.get("GOOGLE_CREDENTIALS_FILE", "/Users/yuta/Desktop/snappy-density-451702-c0-04b85779ba38.json")
 SPREADSHEET_ID = os.environ.get("SPREADSHEET_ID", "1qe1WK1IAJPD-8fxE-4E9maWzVGjw5xAhO94vWUyJY2s")
 SHEET_NAME = "NEW"
+SHEET_HEADERS = ["店舗ID", "店舗名", "電話番号", "URL", "エリア", "ジャンル", "検出日時", "ステータス"]
+SHEET_APPEND_ROWS = 500  # append_rows 1回で送る最大行数
+SHEET_RETRIES = 4  # 書き込み上限（429）・5xx 時の再試行回数
+SHEET_RETRY_BACKOFF = 10.0  # 再試行待機の基準秒数（Sheets API の上限は1分単位なので長め）
+SHEET_RETRY_STATUS = {429, 500, 502, 503}
 
 # データ保存先
-DATA_FILE = "known_salons.json"
+DATA_FILE = "known_salons.json"  # 旧形式（STATE_BACKEND=json、または sqlite への移行元）
+DB_FILE = "salons.db"
+SNAPSHOT_FILE = "known_salons.bin"  # STATE_BACKEND=snapshot 用のバイナリスナップショット
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "sqlite")  # sqlite / snapshot / json
+KNOWN_TTL_DAYS = float(os.environ.get("KNOWN_TTL_DAYS", "90"))  # 一覧で最後に確認してからこの日数を過ぎた店舗は既知リストから削除（0で無期限）
+LISTING_EVENTS_FILE = os.environ.get("LISTING_EVENTS_FILE", "listing_events.jsonl")  # 掲載の変化の追記ログ（空なら出力しない）
+LISTING_EVENTS_MAX_BYTES = 5 * 1024 * 1024  # listing_events.jsonl がこれを超えたら古い半分を削除
+SCAN_STATE_FILE = "scan_state.json"
+SHEET_INDEX_FILE = "sheet_ids.json"  # スプシA列（店舗ID）のローカルミラー
+JOURNAL_FILE = "run_journal.jsonl"  # 実行中の進捗（検出・スプシ追加・通知）の追記ログ。正常終了で削除
+HTTP_CACHE_FILE = "http_cache.json.gz"  # 一覧ページのHTTPキャッシュ（ETag/Last-Modified/内容ハッシュ）
+PHONE_CACHE_FILE = "phone_cache.json"  # 店舗ID → 電話番号のキャッシュ
+PHONE_CACHE_TTL_DAYS = float(os.environ.get("PHONE_CACHE_TTL_DAYS", "30"))  # 電話番号キャッシュの有効期間
+PHONE_NEGATIVE_TTL_HOURS = float(os.environ.get("PHONE_NEGATIVE_TTL_HOURS", "1"))  # 「取得できず」を再確認するまでの初期間隔
+HTTP_CACHE_MAX_ENTRIES = int(os.environ.get("HTTP_CACHE_MAX_ENTRIES", "2000"))  # 超えたら古い順に削除
+
+# 計測（1サイクルごとに1行のJSONを追記。任意で Prometheus の textfile も出力）
+METRICS_FILE = os.environ.get("METRICS_FILE", "metrics.jsonl")  # 空なら出力しない
+METRICS_PROM_FILE = os.environ.get("METRICS_PROM_FILE", "")  # node_exporter の textfile collector 用（空なら出力しない）
+METRICS_MAX_BYTES = 5 * 1024 * 1024  # metrics.jsonl がこれを超えたら古い半分を削除
+METRICS_TRACE_TOP = 5  # 種類ごとに記録する遅い処理の件数
+METRICS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # 所要時間ヒストグラムの境界（秒）
 
 # リクエスト設定
-REQUEST_DELAY = 1.5  # リクエスト間隔（秒）
+REQUEST_RATE = float(os.environ.get("REQUEST_RATE", "0.67"))  # ホットペッパーへの平均リクエスト数/秒（従来の1.5秒間隔。上げるときは明示的に指定）
+REQUEST_BURST = 2  # 連続して送れるリクエスト数の上限
+SCAN_CONCURRENCY = int(os.environ.get("SCAN_CONCURRENCY", "4"))  # 同時にスキャンするエリア数（1で逐次）
+PHONE_CONCURRENCY = int(os.environ.get("PHONE_CONCURRENCY", "4"))  # 電話番号ページの同時取得数
+REQUEST_TIMEOUT = 30  # タイムアウト（秒）
+MAX_RETRIES = 3  # 429/5xx/タイムアウト時の最大リトライ回数
+RETRY_BACKOFF = 2.0  # リトライ待機の基準秒数（指数バックオフ）
+RETRY_STATUS = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}  # 送信後の失敗でも再試行してよいメソッド
+RATE_LIMIT_MAX_WAIT = 300  # X-RateLimit-Reset まで待つ上限（秒）
+POOL_SIZE = 10  # ホストあたりのコネクションプール数
 MAX_PAGES = 50  # 1カテゴリあたり最大ページ数（安全装置）
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
+# 一覧ページのパーサ（auto: selectolax → lxml → bs4 の順で利用可能なもの）
+PARSER_BACKEND = os.environ.get("PARSER_BACKEND", "auto")
+
+# 差分スキャン設定（既知の店舗だけのページが続いたらページ送りを打ち切る）
+SCAN_MODE = os.environ.get("SCAN_MODE", "incremental")  # incremental / full
+INCREMENTAL_STOP_PAGES = int(os.environ.get("INCREMENTAL_STOP_PAGES", "2"))  # 打ち切るまでの既知ページ連続数
+FULL_SWEEP_INTERVAL_HOURS = float(os.environ.get("FULL_SWEEP_INTERVAL_HOURS", "6"))  # 全件スキャンの間隔（並び替え対策）
+
+# エリアごとのスキャン頻度（差分スキャン時。新規掲載の多いエリアほど頻繁に見る）
+SCAN_SCHEDULER = os.environ.get("SCAN_SCHEDULER", "adaptive")  # adaptive / all（毎回全エリア）
+POLL_BUDGET_PER_HOUR = int(os.environ.get("POLL_BUDGET_PER_HOUR", "600"))  # ホットペッパーへの1時間あたりのリクエスト上限
+POLL_TARGET_NEW = float(os.environ.get("POLL_TARGET_NEW", "0.5"))  # 見込みの新規店舗数がこれを超えたらスキャン
+POLL_MAX_INTERVAL_MIN = float(os.environ.get("POLL_MAX_INTERVAL_MIN", "60"))  # 新規が少ないエリアでも最低この間隔で確認
+POLL_HALF_LIFE_HOURS = float(os.environ.get("POLL_HALF_LIFE_HOURS", "24"))  # 到着率の移動平均の半減期
+POLL_WARMUP_HOURS = float(os.environ.get("POLL_WARMUP_HOURS", "1"))  # 観測がこの時間に満たないエリアは毎回確認（予算の範囲で）
+
+# 常駐モード（python main.py --daemon）
+DAEMON_INTERVAL_SEC = float(os.environ.get("DAEMON_INTERVAL_SEC", "60"))  # 監視サイクルの間隔
+DAEMON_JITTER_SEC = float(os.environ.get("DAEMON_JITTER_SEC", "10"))  # 間隔に加えるランダムな揺らぎ（0〜指定秒）
+
+# プロファイルモード（python main.py --profile）
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profile")  # レポート・pstats・collapsed stack の出力先
+PROFILE_SAMPLE_INTERVAL = 0.005  # スタックサンプリングの間隔（秒）
+PROFILE_TRACE_FRAMES = 1  # tracemalloc が確保箇所として記録するフレーム数
+PROFILE_TOP = 30  # レポートに載せる関数・確保箇所の数
+
+# ストリーミング処理（見つけた新規店舗を出力先ごとに件数か時間でまとめて送る）
+NOTIFY_BATCH_SIZE = 50  # Chatwork 1回の通知にまとめる最大件数
+NOTIFY_FIRST_BATCH_SECONDS = float(os.environ.get("NOTIFY_FIRST_BATCH_SECONDS", "2"))  # 1通目: 最初の1件から後続を待つ最大秒数（すぐ知らせる）
+NOTIFY_BATCH_SECONDS = float(os.environ.get("NOTIFY_BATCH_SECONDS", "45"))  # 2通目以降: 後続をまとめて待つ最大秒数（通数を抑える）
+NOTIFY_LISTING_EVENTS = os.environ.get("NOTIFY_LISTING_EVENTS", "")  # Chatwork にも送る掲載の変化（例: removed,renamed,relisted。空なら送らない）
+SHEET_BATCH_SIZE = 500  # スプシ1回の追加にまとめる最大件数
+SHEET_BATCH_SECONDS = float(os.environ.get("SHEET_BATCH_SECONDS", "10"))
+
 # 監視対象エリア（全国9地域）
 AREAS = {
     "svcSA": "関東",
@@ -56,26 +153,392 @@ GENRES = {
     "hair": {"prefix": "", "name": "美容室"},
 }
 
+# 取得先（ベンチマークではローカルのスタンドインサーバに向ける）
+BASE_URL = os.environ.get("HOTPEPPER_BASE_URL", "https://beauty.hotpepper.jp")
+
 # NEW OPEN特集のパス
 NEW_OPEN_PATH = "spkSP13_spdL035/"
 
 
+# ============================================
+# ファイル書き込み
+# ============================================
+
+def atomic_write(path: str, data: bytes):
+    """一時ファイルに書いて fsync してから置き換える（途中で止まっても元のファイルは壊れない）"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def atomic_write_json(path: str, data, **kwargs):
+    atomic_write(path, json.dumps(data, ensure_ascii=False, **kwargs).encode("utf-8"))
+
+
+def append_jsonl(path: str, records: Iterable[Dict], max_bytes: int):
+    """JSON Lines で追記し、max_bytes を超えたら古い半分を削除"""
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+    if os.path.getsize(path) > max_bytes:
+        with open(path, "rb") as f:
+            lines = f.readlines()
+        atomic_write(path, b"".join(lines[len(lines) // 2:]))
+
+
+# ============================================
+# 計測（メトリクス・トレース）
+# ============================================
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def metric_key(name: str, labels: Dict) -> MetricKey:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def format_metric(key: MetricKey, prefix: str = "", extra: str = "") -> str:
+    """name{label="value",...} の形に整形"""
+    name, labels = key
+    pairs = [f'{label}="{value}"' for label, value in labels] + ([extra] if extra else [])
+    return f"{prefix}{name}{{{','.join(pairs)}}}" if pairs else f"{prefix}{name}"
+
+
+class Metrics:
+    """1サイクル分のカウンタ・所要時間と、遅かった処理のトレース（スレッドセーフ）
+
+    カウンタと所要時間はラベル（ホスト・ステータス・パーサなど）ごとに集計する。
+    所要時間は種類ごとに遅い順 METRICS_TRACE_TOP 件を属性（URL など）付きで残す。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.counters: Dict[MetricKey, float] = {}
+            self.durations: Dict[MetricKey, List[float]] = {}
+            self.slowest: Dict[str, List[Tuple[float, Dict]]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = metric_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, trace: Optional[Dict] = None, **labels):
+        """所要時間を記録（trace があれば遅い処理の候補として残す）"""
+        key = metric_key(name, labels)
+        with self.lock:
+            self.durations.setdefault(key, []).append(seconds)
+            if trace is None:
+                return
+            slowest = self.slowest.setdefault(name, [])
+            if len(slowest) < METRICS_TRACE_TOP or seconds > slowest[-1][0]:
+                slowest.append((seconds, dict(trace, **labels)))
+                slowest.sort(key=lambda item: item[0], reverse=True)
+                del slowest[METRICS_TRACE_TOP:]
+
+    @contextlib.contextmanager
+    def timer(self, name: str, trace: Optional[Dict] = None, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, trace, **labels)
+
+    def report(self, **fields) -> Dict:
+        """実行レポート（所要時間は件数・合計・p50・p95・最大の秒数）"""
+        with self.lock:
+            durations = {}
+            for key, values in sorted(self.durations.items()):
+                values = sorted(values)
+                durations[format_metric(key)] = {
+                    "count": len(values),
+                    "sum": round(sum(values), 4),
+                    "p50": round(values[len(values) // 2], 4),
+                    "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 4),
+                    "max": round(values[-1], 4),
+                }
+            return {
+                "time": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                "duration_sec": round(time.time() - self.started, 3),
+                **fields,
+                "counters": {format_metric(key): value for key, value in sorted(self.counters.items())},
+                "durations": durations,
+                "slowest": {
+                    name: [dict(attrs, seconds=round(seconds, 4)) for seconds, attrs in slowest]
+                    for name, slowest in sorted(self.slowest.items())
+                },
+            }
+
+    def prometheus(self, report: Dict) -> str:
+        """Prometheus の textfile 形式（直近1サイクルの値。カウンタは gauge、所要時間は histogram）"""
+        lines = [
+            "# TYPE hotpepper_last_run_timestamp_seconds gauge",
+            f"hotpepper_last_run_timestamp_seconds {self.started:.0f}",
+            "# TYPE hotpepper_run_duration_seconds gauge",
+            f"hotpepper_run_duration_seconds {report['duration_sec']}",
+        ]
+        for field, value in report.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and field != "duration_sec":
+                lines += [f"# TYPE hotpepper_run_{field} gauge", f"hotpepper_run_{field} {value}"]
+        with self.lock:
+            typed = set()
+            for key, value in sorted(self.counters.items()):
+                if key[0] not in typed:
+                    typed.add(key[0])
+                    lines.append(f"# TYPE hotpepper_{key[0]} gauge")
+                lines.append(f"{format_metric(key, 'hotpepper_')} {value:g}")
+            for (name, labels), values in sorted(self.durations.items()):
+                name = f"{name}_seconds"
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE hotpepper_{name} histogram")
+                bounds = [f"{bound:g}" for bound in METRICS_BUCKETS] + ["+Inf"]
+                counts = [sum(1 for value in values if value <= bound) for bound in METRICS_BUCKETS] + [len(values)]
+                for bound, count in zip(bounds, counts):
+                    le = f'le="{bound}"'
+                    lines.append(f"{format_metric((name + '_bucket', labels), 'hotpepper_', le)} {count}")
+                lines.append(f"{format_metric((name + '_sum', labels), 'hotpepper_')} {sum(values):.6f}")
+                lines.append(f"{format_metric((name + '_count', labels), 'hotpepper_')} {len(values)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, **fields) -> Dict:
+        """実行レポートを METRICS_FILE に1行追記し、METRICS_PROM_FILE があれば置き換える"""
+        report = self.report(**fields)
+        if METRICS_FILE:
+            append_jsonl(METRICS_FILE, [report], METRICS_MAX_BYTES)
+        if METRICS_PROM_FILE:
+            atomic_write(METRICS_PROM_FILE, self.prometheus(report).encode("utf-8"))
+        return report
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """共有の計測値を取得"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
+
+
 # ============================================
 # HTTP通信
 # ============================================
 
+class TokenBucket:
+    """トークンバケット方式のレートリミッタ（スレッドセーフ。rate が None なら待たずに数えるだけ）"""
+
+    def __init__(self, rate: Optional[float], capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.acquired = 0  # これまでに送ったリクエスト数（リトライを含む）
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """トークンを1つ取得（足りなければ補充まで待機）"""
+        while True:
+            with self.lock:
+                if self.rate is None:
+                    self.acquired += 1
+                    return
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.acquired += 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HttpClient:
+    """コネクションプール・リトライ・ホスト別レート制限付きHTTPクライアント"""
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = requests.adapters.HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        """ホストごとのレートリミッタを取得（REQUEST_RATE はホットペッパー（BASE_URL のホスト）だけに適用。
+        Chatwork などの API は呼び出し側がそれぞれの制限に合わせて送信間隔を調整する）"""
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                polite = host == urlsplit(BASE_URL).netloc
+                self.buckets[host] = TokenBucket(REQUEST_RATE, REQUEST_BURST) if polite else TokenBucket(None, 0)
+            return self.buckets[host]
+
+    def request(self, method: str, url: str, idempotent: Optional[bool] = None, **kwargs) -> requests.Response:
+        """リトライ付きでリクエストを送信（429/5xx/タイムアウトは指数バックオフで再試行。
+        Retry-After / X-RateLimit-Reset があればバックオフの代わりにその時間だけ待つ）
+
+        idempotent が False（省略時は POST など IDEMPOTENT_METHODS 以外）のリクエストは、届いたかも
+        しれないものを送り直さないよう、接続の確立前の失敗と 429 だけ再試行する。
+        """
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+        bucket = self.bucket(url)
+        host = urlsplit(url).netloc
+        metrics = get_metrics()
+        attempt = 0
+        while True:
+            with metrics.timer("http_wait", host=host):
+                bucket.acquire()
+            started = time.perf_counter()
+            wait = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                metrics.inc("http_errors", host=host, error=type(e).__name__)
+                if attempt >= MAX_RETRIES or not (idempotent or is_connect_error(e)):
+                    raise
+                print(f"[RETRY] {url}: {e}")
+            else:
+                metrics.observe("http_request", time.perf_counter() - started,
+                                {"method": method, "url": url, "status": response.status_code, "attempt": attempt}, host=host)
+                metrics.inc("http_responses", host=host, status=response.status_code)
+                metrics.inc("http_bytes", len(response.content), host=host)
+                retryable = response.status_code in RETRY_STATUS if idempotent else response.status_code == 429
+                if not retryable or attempt >= MAX_RETRIES:
+                    return response
+                print(f"[RETRY] HTTP {response.status_code}: {url}")
+                wait = retry_after_seconds(response)
+            metrics.inc("http_retries", host=host)
+            time.sleep(backoff_delay(attempt) if wait is None else wait)
+            attempt += 1
+
+    def sent(self, url: str) -> int:
+        """url のホストに送ったリクエスト数"""
+        return self.bucket(url).acquired
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+def is_connect_error(e: Exception) -> bool:
+    """接続の確立前の失敗か（リクエストはまだ送られていない）"""
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(e.args[0], "reason", None) if e.args else None
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """再試行まで待つ秒数（Retry-After、なければ X-RateLimit-Reset の時刻まで。どちらも RATE_LIMIT_MAX_WAIT まで）"""
+    retry_after = response.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        return min(int(retry_after), RATE_LIMIT_MAX_WAIT)
+    reset = response.headers.get("X-RateLimit-Reset", "")
+    if reset.isdigit():
+        return min(max(0.0, int(reset) - time.time()), RATE_LIMIT_MAX_WAIT)
+    return None
+
+
+def backoff_delay(attempt: int, base: Optional[float] = None) -> float:
+    """ジッター付き指数バックオフの待機秒数"""
+    return (RETRY_BACKOFF if base is None else base) * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+_http_client: Optional[HttpClient] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """共有HTTPクライアントを取得"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HttpClient()
+        return _http_client
+
+
+class PageCache:
+    """一覧ページのHTTPキャッシュ（URL単位で検証子・内容ハッシュ・抽出結果を保持）"""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        self.stats = {"not_modified": 0, "unchanged": 0, "parsed": 0}
+        if os.path.exists(path):
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARN] HTTPキャッシュ読み込み失敗（破棄します）: {e}")
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self.lock:
+            return self.entries.get(url)
+
+    def put(self, url: str, entry: Dict):
+        with self.lock:
+            self.entries[url] = entry
+
+    def touch(self, url: str):
+        with self.lock:
+            if url in self.entries:
+                self.entries[url]["used"] = time.time()
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    def save(self):
+        """上限を超えた分を最終利用の古い順に削除して保存"""
+        with self.lock:
+            if len(self.entries) > self.max_entries:
+                urls = sorted(self.entries, key=lambda u: self.entries[u].get("used", 0), reverse=True)
+                self.entries = {u: self.entries[u] for u in urls[:self.max_entries]}
+            data = json.dumps(self.entries, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            atomic_write(self.path, gzip.compress(data))
+
+
+_page_cache: Optional[PageCache] = None
+
+
+def get_page_cache() -> PageCache:
+    """共有HTTPキャッシュを取得"""
+    global _page_cache
+    with _http_client_lock:
+        if _page_cache is None:
+            _page_cache = PageCache(HTTP_CACHE_FILE, HTTP_CACHE_MAX_ENTRIES)
+        return _page_cache
+
+
 def fetch_page(url: str) -> Optional[str]:
     """ページを取得"""
-    headers = {"User-Agent": USER_AGENT}
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return response.text
-    except requests.exceptions.HTTPError as e:
+        response = get_http_client().get(url)
         if response.status_code == 404:
             return None  # 404は最終ページ超過の可能性
-        print(f"[ERROR] HTTP {response.status_code}: {url}")
-        return None
+        if not response.ok:
+            print(f"[ERROR] HTTP {response.status_code}: {url}")
+            return None
+        return response.text
     except Exception as e:
         print(f"[ERROR] {url}: {e}")
         return None
@@ -87,22 +550,162 @@ def fetch_page(url: str) -> Optional[str]:
 
 def get_new_open_url(genre_prefix: str, area_code: str, page: int = 1) -> str:
     """NEW OPEN特集ページのURLを生成"""
-    base = "https://beauty.hotpepper.jp"
+    base = BASE_URL
     if page == 1:
         return f"{base}/{genre_prefix}{area_code}/{NEW_OPEN_PATH}"
     else:
         return f"{base}/{genre_prefix}{area_code}/{NEW_OPEN_PATH}PN{page}.html"
 
 
-def extract_salons(html: str) -> List[Dict]:
+class Salon:
+    """店舗1件（一覧ページ → 差分 → 電話番号 → 出力先まで、この形のまま流す）
+
+    店舗IDは数値部分だけを持ち、エリア・ジャンルは intern した文字列を全店舗で共有する。
+    URL・電話番号ページのURLは使うときに組み立てる（一覧の店舗の大半は既知で使われない）。
+    phone は未取得なら None。進捗ログなど外部との受け渡しは to_dict / from_dict で行う。
+    """
+
+    __slots__ = ("number", "name", "area", "genre", "phone")
+
+    def __init__(self, number: int, name: str, area: str = "", genre: str = "", phone: Optional[str] = None):
+        self.number = number
+        self.name = name
+        self.area = sys.intern(area)
+        self.genre = sys.intern(genre)
+        self.phone = phone
+
+    @property
+    def id(self) -> str:
+        return salon_id_from_number(self.number)
+
+    @property
+    def url(self) -> str:
+        return f"{BASE_URL}/{self.id}/"
+
+    @property
+    def tel_url(self) -> str:
+        return f"{BASE_URL}/{self.id}/tel/"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Salon):
+            return NotImplemented
+        return (self.number, self.name, self.area, self.genre, self.phone) == \
+            (other.number, other.name, other.area, other.genre, other.phone)
+
+    def __repr__(self) -> str:
+        return f"Salon({self.id!r}, {self.name!r})"
+
+    def to_dict(self) -> Dict:
+        return {"id": self.id, "name": self.name, "url": self.url, "area": self.area, "genre": self.genre,
+                "phone": self.phone}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Salon":
+        return cls(salon_number(data["id"]), data.get("name", ""), data.get("area", ""), data.get("genre", ""),
+                   data.get("phone"))
+
+
+@dataclass
+class PageAnalysis:
+    """一覧ページの解析結果（1回のパースで得られる情報一式）"""
+    salons: List[Salon]
+    total_pages: int
+    has_next: bool
+
+
+SALON_ID_PATTERN = re.compile(r'/(slnH\d+)/')
+PAGE_COUNT_PATTERN = re.compile(r'(\d+)/(\d+)ページ')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# BeautifulSoup の get_text() が対象外にするテキストの親タグ
+NON_TEXT_TAGS = {"script", "style", "template"}
+
+
+def analyze_page(html: str, current_page: int) -> PageAnalysis:
+    """一覧ページを1回だけパースして店舗・総ページ数・次ページ有無をまとめて取得"""
+    backend = get_parser_backend()
+    with get_metrics().timer("parse", page="list", backend=backend):
+        return PARSER_BACKENDS[backend](html, current_page)
+
+
+def get_parser_backend() -> str:
+    """使用するパーサを決定（PARSER_BACKEND=auto なら利用可能な最速のもの）"""
+    if PARSER_BACKEND != "auto":
+        if PARSER_BACKEND not in PARSER_BACKENDS:
+            raise ValueError(f"PARSER_BACKEND が不正です: {PARSER_BACKEND}（auto / {' / '.join(PARSER_BACKENDS)}）")
+        if not load_parser(PARSER_BACKEND):
+            raise ValueError(f"PARSER_BACKEND={PARSER_BACKEND} のパーサがインストールされていません"
+                             f"（pip install {PARSER_PACKAGES[PARSER_BACKEND]}）")
+        return PARSER_BACKEND
+    for backend in ("selectolax", "lxml"):
+        if load_parser(backend):
+            return backend
+    return "bs4"
+
+
+_parser_available: Dict[str, bool] = {}
+PARSER_PACKAGES = {"selectolax": "selectolax", "lxml": "lxml", "bs4": "beautifulsoup4"}
+
+
+def load_parser(backend: str) -> bool:
+    """パーサのモジュールを読み込む（初回のみ。インストールされていなければ False）"""
+    global BeautifulSoup, LexborHTMLParser, lxml
+    available = _parser_available.get(backend)
+    if available is not None:
+        return available
+    try:
+        if backend == "selectolax":
+            from selectolax.lexbor import LexborHTMLParser
+        elif backend == "lxml":
+            import lxml.etree
+            import lxml.html
+            _compile_lxml_xpaths()
+        elif backend == "bs4":
+            from bs4 import BeautifulSoup
+        available = True
+    except ImportError:
+        available = False
+    _parser_available[backend] = available
+    return available
+
+
+def make_soup(html: str) -> "BeautifulSoup":
+    """html.parser で BeautifulSoup を作る"""
+    if BeautifulSoup is None:
+        load_parser("bs4")
+    return BeautifulSoup(html, "html.parser")
+
+
+def _analyze_page_bs4(html: str, current_page: int) -> PageAnalysis:
+    soup = make_soup(html)
+    return PageAnalysis(
+        salons=_extract_salons(soup),
+        total_pages=_get_total_pages(soup),
+        has_next=_has_next_page(soup, current_page),
+    )
+
+
+def extract_salons(html: str) -> List[Salon]:
     """HTMLから店舗情報を抽出"""
-    soup = BeautifulSoup(html, "html.parser")
+    return _extract_salons(make_soup(html))
+
+
+def get_total_pages(html: str) -> int:
+    """総ページ数を取得"""
+    return _get_total_pages(make_soup(html))
+
+
+def has_next_page(html: str, current_page: int) -> bool:
+    """次のページがあるかチェック"""
+    return _has_next_page(make_soup(html), current_page)
+
+
+def _extract_salons(soup: "BeautifulSoup") -> List[Salon]:
     salons = []
     seen_ids = set()
     
     for link in soup.find_all("a", href=True):
         href = link["href"]
-        match = re.search(r'/(slnH\d+)/', href)
+        match = SALON_ID_PATTERN.search(href)
         if not match:
             continue
             
@@ -126,183 +729,1239 @@ def extract_salons(html: str) -> List[Dict]:
         if not salon_name:
             salon_name = link.get_text(strip=True)[:60]
         
-        # 店舗名のクリーニング
-        salon_name = re.sub(r'\s+', ' ', salon_name).strip()[:60]
-        
-        salons.append({
-            "id": salon_id,
-            "name": salon_name,
-            "url": f"https://beauty.hotpepper.jp/{salon_id}/",
-            "tel_url": f"https://beauty.hotpepper.jp/{salon_id}/tel/"
-        })
+        salons.append(_make_salon(salon_id, salon_name))
     
     return salons
 
 
-def get_total_pages(html: str) -> int:
-    """総ページ数を取得"""
-    soup = BeautifulSoup(html, "html.parser")
-    page_text = soup.find(string=re.compile(r'\d+/\d+ページ'))
+def _get_total_pages(soup: "BeautifulSoup") -> int:
+    page_text = soup.find(string=PAGE_COUNT_PATTERN)
     if page_text:
-        match = re.search(r'(\d+)/(\d+)ページ', page_text)
+        match = PAGE_COUNT_PATTERN.search(page_text)
         if match:
             return int(match.group(2))
     return 1
 
 
-def has_next_page(html: str, current_page: int) -> bool:
-    """次のページがあるかチェック"""
-    soup = BeautifulSoup(html, "html.parser")
+def _has_next_page(soup: "BeautifulSoup", current_page: int) -> bool:
     next_page = current_page + 1
     next_link = soup.find("a", href=re.compile(rf"PN{next_page}\.html"))
     return next_link is not None
 
 
+def _make_salon(salon_id: str, salon_name: str) -> Salon:
+    """店舗名の空白を詰めて60文字まで"""
+    return Salon(salon_number(salon_id), WHITESPACE_PATTERN.sub(' ', salon_name).strip()[:60])
+
+
+def _analyze_page_lxml(html: str, current_page: int) -> PageAnalysis:
+    load_parser("lxml")
+    root = lxml.html.document_fromstring(html.encode("utf-8"), parser=_LXML_PARSER)
+    salons = []
+    seen_ids = set()
+
+    for link in _LXML_SALON_LINKS(root):
+        match = SALON_ID_PATTERN.search(link.get("href"))
+        if not match:
+            continue
+        salon_id = match.group(1)
+        if salon_id in seen_ids:
+            continue
+        seen_ids.add(salon_id)
+
+        # 店舗名を取得（BeautifulSoup 版と同じ探索順）
+        salon_name = ""
+        parent = next(link.iterancestors("li", "div"), None)
+        if parent is not None:
+            h3 = next(parent.iter("h3"), None)
+            if h3 is not None:
+                a_tag = next(h3.iterdescendants("a"), None)
+                salon_name = _lxml_text(a_tag if a_tag is not None else h3)
+
+        if not salon_name:
+            salon_name = _lxml_text(link)[:60]
+
+        salons.append(_make_salon(salon_id, salon_name))
+
+    total_pages = 1
+    for text in _LXML_PAGE_TEXTS(root):
+        match = PAGE_COUNT_PATTERN.search(text)
+        if match:
+            total_pages = int(match.group(2))
+            break
+
+    has_next = bool(_LXML_NEXT_LINKS(root, href=f"PN{current_page + 1}.html"))
+    return PageAnalysis(salons=salons, total_pages=total_pages, has_next=has_next)
+
+
+def _lxml_text(element) -> str:
+    """BeautifulSoup の get_text(strip=True) 相当"""
+    return "".join(text.strip() for text in _LXML_TEXTS(element))
+
+
+def _compile_lxml_xpaths():
+    global _LXML_PARSER, _LXML_SALON_LINKS, _LXML_PAGE_TEXTS, _LXML_NEXT_LINKS, _LXML_TEXTS
+    _LXML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+    _LXML_SALON_LINKS = lxml.etree.XPath("//a[contains(@href, 'slnH')]")
+    _LXML_PAGE_TEXTS = lxml.etree.XPath("//text()[contains(., 'ページ')]")
+    _LXML_NEXT_LINKS = lxml.etree.XPath("//a[contains(@href, $href)]")
+    _LXML_TEXTS = lxml.etree.XPath(".//text()[not(parent::script or parent::style or parent::template)]")
+
+
+def _analyze_page_selectolax(html: str, current_page: int) -> PageAnalysis:
+    load_parser("selectolax")
+    tree = LexborHTMLParser(html)
+    salons = []
+    seen_ids = set()
+
+    for link in tree.css("a[href*='slnH']"):
+        match = SALON_ID_PATTERN.search(link.attributes.get("href") or "")
+        if not match:
+            continue
+        salon_id = match.group(1)
+        if salon_id in seen_ids:
+            continue
+        seen_ids.add(salon_id)
+
+        # 店舗名を取得（BeautifulSoup 版と同じ探索順）
+        salon_name = ""
+        parent = link.parent
+        while parent is not None and parent.tag not in ("li", "div"):
+            parent = parent.parent
+        if parent is not None:
+            h3 = parent.css_first("h3")
+            if h3 is not None:
+                a_tag = h3.css_first("a")
+                salon_name = _selectolax_text(a_tag if a_tag is not None else h3)
+
+        if not salon_name:
+            salon_name = _selectolax_text(link)[:60]
+
+        salons.append(_make_salon(salon_id, salon_name))
+
+    total_pages = 1
+    body = tree.root
+    if body is not None:
+        for node in body.traverse(include_text=True):
+            if not node.is_text_node:
+                continue
+            match = PAGE_COUNT_PATTERN.search(node.text_content or "")
+            if match:
+                total_pages = int(match.group(2))
+                break
+
+    has_next = tree.css_first(f"a[href*='PN{current_page + 1}.html']") is not None
+    return PageAnalysis(salons=salons, total_pages=total_pages, has_next=has_next)
+
+
+def _selectolax_text(node) -> str:
+    """BeautifulSoup の get_text(strip=True) 相当"""
+    parts = []
+    for child in node.traverse(include_text=True):
+        if child.is_text_node and child.parent.tag not in NON_TEXT_TAGS:
+            parts.append((child.text_content or "").strip())
+    return "".join(parts)
+
+
+PARSER_BACKENDS = {
+    "selectolax": _analyze_page_selectolax,
+    "lxml": _analyze_page_lxml,
+    "bs4": _analyze_page_bs4,
+}
+
+
+def fetch_list_page(url: str, current_page: int) -> Optional[PageAnalysis]:
+    """一覧ページを取得して解析（条件付きGET。未変更なら前回の抽出結果を再利用）"""
+    cache = get_page_cache()
+    entry = cache.get(url)
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        response = get_http_client().get(url, headers=headers)
+    except Exception as e:
+        print(f"[ERROR] {url}: {e}")
+        return None
+
+    if response.status_code == 304 and entry:
+        cache.count("not_modified")
+        cache.touch(url)
+        return _cached_analysis(entry)
+    if response.status_code == 404:
+        return None  # 404は最終ページ超過の可能性
+    if not response.ok:
+        print(f"[ERROR] HTTP {response.status_code}: {url}")
+        return None
+
+    digest = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+    if entry and entry.get("hash") == digest:
+        cache.count("unchanged")
+        analysis = _cached_analysis(entry)
+    else:
+        cache.count("parsed")
+        analysis = analyze_page(response.text, current_page)
+
+    cache.put(url, {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "hash": digest,
+        "salons": [[salon.id, salon.name] for salon in analysis.salons],
+        "total_pages": analysis.total_pages,
+        "has_next": analysis.has_next,
+        "used": time.time(),
+    })
+    return analysis
+
+
+def _cached_analysis(entry: Dict) -> PageAnalysis:
+    return PageAnalysis(
+        salons=[_make_salon(salon_id, name) for salon_id, name in entry["salons"]],
+        total_pages=entry["total_pages"],
+        has_next=entry["has_next"],
+    )
+
+
 def get_phone_number(tel_url: str) -> str:
-    """電話番号ページから電話番号を取得"""
-    html = fetch_page(tel_url)
-    if not html:
-        return ""
-    
-    soup = BeautifulSoup(html, "html.parser")
-    
+    """電話番号ページから電話番号を取得（キャッシュなし）"""
+    return fetch_phone_number(tel_url) or ""
+
+
+def fetch_phone_number(tel_url: str) -> Optional[str]:
+    """電話番号ページを取得して電話番号を抽出（載っていない・404 は ""、取得エラーは None）
+
+    5xx・タイムアウトの再試行は HttpClient に任せ、ここでは重ねて再試行しない。
+    """
+    metrics = get_metrics()
+    with metrics.timer("phone_lookup", {"url": tel_url}):
+        try:
+            response = get_http_client().get(tel_url)
+        except Exception as e:
+            print(f"[ERROR] {tel_url}: {e}")
+            response = None
+        if response is not None and response.status_code == 404:
+            metrics.inc("phone_lookups", result="not_found")
+            return ""
+        if response is None or not response.ok:
+            if response is not None:
+                print(f"[ERROR] HTTP {response.status_code}: {tel_url}")
+            metrics.inc("phone_lookups", result="error")
+            return None
+        with metrics.timer("parse", page="tel", backend="regex"):
+            phone = extract_phone_number(response.text)
+    metrics.inc("phone_lookups", result="found" if phone else "not_found")
+    return phone
+
+
+PHONE_TD_PATTERN = re.compile(r'<td\b([^>]*)>(.*?)</td\s*>', re.S | re.I)
+PHONE_A_PATTERN = re.compile(r'<a\b([^>]*)>', re.I)
+CLASS_ATTR_PATTERN = re.compile(r'\bclass\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.I)
+HREF_ATTR_PATTERN = re.compile(r'\bhref\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.I)
+PHONE_CLASS_PATTERN = re.compile(r'fs16|b')
+TAG_PATTERN = re.compile(r'<[^>]*>')
+NON_TEXT_BLOCK_PATTERN = re.compile(r'<!--.*?-->|<(script|style|template)\b[^>]*>.*?</\1\s*>', re.S | re.I)
+PHONE_TEXT_PATTERN = re.compile(r'(\d{2,4}[-‐ー]\d{2,4}[-‐ー]\d{3,4})')
+PHONE_NORMALIZE_TABLE = str.maketrans("‐‑–—―−ーｰ－０１２３４５６７８９", "---------0123456789")
+
+
+def extract_phone_number(html: str) -> str:
+    """電話番号ページのHTMLから電話番号を抽出（生HTMLを1回走査し、見つかった時点で終了）"""
     # パターン1: <td class="fs16 b">045-594-9284</td>
-    td = soup.find("td", class_=re.compile(r"fs16|b"))
-    if td:
-        phone = td.get_text(strip=True)
+    for match in PHONE_TD_PATTERN.finditer(html):
+        class_value = _attr_value(CLASS_ATTR_PATTERN, match.group(1))
+        if class_value is None or not PHONE_CLASS_PATTERN.search(class_value):
+            continue
+        phone = _strip_tags(match.group(2))
         if re.match(r'[\d\-]+', phone):
-            return phone
-    
+            return normalize_phone_number(phone)
+        break
+
     # パターン2: telリンク
-    tel_link = soup.find("a", href=re.compile(r"tel:"))
-    if tel_link:
-        phone = tel_link.get("href", "").replace("tel:", "")
-        return phone
-    
+    for match in PHONE_A_PATTERN.finditer(html):
+        href = _attr_value(HREF_ATTR_PATTERN, match.group(1))
+        if href is not None and "tel:" in href:
+            return normalize_phone_number(href.replace("tel:", ""))
+
     # パターン3: テキストから電話番号を抽出
-    text = soup.get_text()
-    phone_match = re.search(r'(\d{2,4}[-‐ー]\d{2,4}[-‐ー]\d{3,4})', text)
+    text = unescape(TAG_PATTERN.sub("", NON_TEXT_BLOCK_PATTERN.sub("", html)))
+    phone_match = PHONE_TEXT_PATTERN.search(text)
     if phone_match:
-        return phone_match.group(1)
-    
+        return normalize_phone_number(phone_match.group(1))
+
     return ""
 
 
-def scan_category(genre_prefix: str, area_code: str, genre_name: str, area_name: str) -> List[Dict]:
-    """1カテゴリの全ページをスキャン"""
-    all_salons = []
+def normalize_phone_number(phone: str) -> str:
+    """全角数字・各種ハイフン（‐ ー － など）を半角に揃える"""
+    return phone.translate(PHONE_NORMALIZE_TABLE).strip()
+
+
+def _attr_value(pattern: re.Pattern, attrs: str) -> Optional[str]:
+    match = pattern.search(attrs)
+    if not match:
+        return None
+    return unescape(next(value for value in match.groups() if value is not None))
+
+
+def _strip_tags(fragment: str) -> str:
+    """BeautifulSoup の get_text(strip=True) 相当"""
+    fragment = NON_TEXT_BLOCK_PATTERN.sub("", fragment)
+    return "".join(unescape(text).strip() for text in TAG_PATTERN.split(fragment))
+
+
+class PhoneCache:
+    """店舗ID → 電話番号の永続キャッシュ（取得できなかった店舗はバックオフしながら再確認）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        self.stats = {"hit": 0, "negative": 0, "miss": 0}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARN] 電話番号キャッシュ読み込み失敗（破棄します）: {e}")
+
+    def get(self, salon_id: str) -> Optional[str]:
+        """有効なキャッシュがあれば電話番号（取得できず確定中は ""）、なければ None"""
+        with self.lock:
+            entry = self.entries.get(salon_id)
+            if entry is None:
+                self.stats["miss"] += 1
+                return None
+            age = time.time() - entry["checked"]
+            if entry["phone"]:
+                if age < PHONE_CACHE_TTL_DAYS * 86400:
+                    self.stats["hit"] += 1
+                    return entry["phone"]
+            elif age < self.negative_ttl(entry["failures"]):
+                self.stats["negative"] += 1
+                return ""
+            self.stats["miss"] += 1
+            return None
+
+    def put(self, salon_id: str, phone: str):
+        with self.lock:
+            failures = 0 if phone else self.entries.get(salon_id, {}).get("failures", 0) + 1
+            self.entries[salon_id] = {"phone": phone, "checked": time.time(), "failures": failures}
+
+    @staticmethod
+    def negative_ttl(failures: int) -> float:
+        """取得できなかった店舗を再確認するまでの秒数（失敗回数に応じて倍々、TTLが上限）"""
+        hours = PHONE_NEGATIVE_TTL_HOURS * (2 ** max(0, failures - 1))
+        return min(hours * 3600, PHONE_CACHE_TTL_DAYS * 86400)
+
+    def save(self):
+        """期限切れを削除して保存"""
+        with self.lock:
+            cutoff = time.time() - PHONE_CACHE_TTL_DAYS * 86400
+            self.entries = {k: v for k, v in self.entries.items() if v["checked"] >= cutoff}
+            atomic_write_json(self.path, self.entries, separators=(",", ":"))
+
+
+_phone_cache: Optional[PhoneCache] = None
+
+
+def get_phone_cache() -> PhoneCache:
+    """共有電話番号キャッシュを取得"""
+    global _phone_cache
+    with _http_client_lock:
+        if _phone_cache is None:
+            _phone_cache = PhoneCache(PHONE_CACHE_FILE)
+        return _phone_cache
+
+
+def lookup_phone(salon: Salon) -> str:
+    """1店舗の電話番号を取得（キャッシュ優先。取得できなければ「取得できず」としてキャッシュし、再確認を待つ）"""
+    cache = get_phone_cache()
+    cached = cache.get(salon.id)
+    if cached is not None:
+        get_metrics().inc("phone_lookups", result="cache")
+        return cached
+
+    phone = fetch_phone_number(salon.tel_url) or ""
+    cache.put(salon.id, phone)
+    return phone
+
+
+def scan_category(genre_prefix: str, area_code: str, genre_name: str, area_name: str,
+                  known_ids: Optional[Container[int]] = None, stats: Optional[Dict] = None) -> List[Salon]:
+    """1カテゴリの全ページをスキャン
+
+    known_ids を渡すと差分スキャンになり、既知の店舗だけのページが
+    INCREMENTAL_STOP_PAGES 回続いた時点でページ送りを打ち切る。
+    """
+    return list(iter_category(genre_prefix, area_code, genre_name, area_name, known_ids, stats))
+
+
+def iter_category(genre_prefix: str, area_code: str, genre_name: str, area_name: str,
+                  known_ids: Optional[Container[int]] = None, stats: Optional[Dict] = None) -> Iterator[Salon]:
+    """scan_category のジェネレータ版（ページを取得するたびにその店舗を返す）"""
     seen_ids = set()
     page = 1
     total_pages = 1
+    fetched = 0
+    skipped = 0
+    known_streak = 0
     
     while page <= min(MAX_PAGES, total_pages + 1):
         url = get_new_open_url(genre_prefix, area_code, page)
         
-        html = fetch_page(url)
-        if not html:
+        analysis = fetch_list_page(url, page)
+        if not analysis:
             break
+        fetched += 1
         
         if page == 1:
-            total_pages = get_total_pages(html)
+            total_pages = analysis.total_pages
             print(f"[SCAN] {genre_name} - {area_name}: {total_pages}ページ")
         
-        salons = extract_salons(html)
         new_count = 0
         
-        for salon in salons:
-            if salon["id"] not in seen_ids:
-                salon["genre"] = genre_name
-                salon["area"] = area_name
-                all_salons.append(salon)
-                seen_ids.add(salon["id"])
+        for salon in analysis.salons:
+            if salon.number not in seen_ids:
+                salon.genre = genre_name
+                salon.area = area_name
+                seen_ids.add(salon.number)
                 new_count += 1
+                yield salon
         
         if page > 1:
-            print(f"  Page {page}/{total_pages}: +{new_count}件")
+            print(f"  [{area_name}] Page {page}/{total_pages}: +{new_count}件")
         
         if page >= total_pages:
             break
-        if not has_next_page(html, page):
+        if not analysis.has_next:
             break
+
+        if known_ids is not None:
+            if all(salon.number in known_ids for salon in analysis.salons):
+                known_streak += 1
+            else:
+                known_streak = 0
+            if known_streak >= INCREMENTAL_STOP_PAGES:
+                skipped = min(MAX_PAGES, total_pages) - page
+                break
             
         page += 1
-        time.sleep(REQUEST_DELAY)
     
-    print(f"  → 合計: {len(all_salons)}件")
-    return all_salons
+    if stats is not None:
+        stats.update({"pages": fetched, "total_pages": total_pages, "skipped": skipped})
+    if skipped:
+        print(f"  [{area_name}] 既知の店舗のみ → 残り{skipped}ページをスキップ")
+    print(f"  [{area_name}] → 合計: {len(seen_ids)}件")
 
 
-def scan_all_categories() -> Dict[str, List[Dict]]:
-    """全エリア・全ジャンルをスキャン"""
-    all_salons = {}
-    
+def get_area_keys() -> List[str]:
+    """スキャン単位（ジャンル_エリア）のキー一覧"""
+    return [f"{genre_key}_{area_code}" for genre_key in GENRES for area_code in AREAS]
+
+
+def scan_all_categories(known: Optional[Container[int]] = None, keys: Optional[Container[str]] = None,
+                        stats: Optional[Dict[str, Dict]] = None) -> Dict[str, List[Salon]]:
+    """全エリア・全ジャンルをスキャン（エリアごとに並列、レート制限は全体で共有）
+
+    known を渡すと差分スキャン（既知の店舗だけになったエリアは途中で打ち切り）。
+    keys を渡すとそのキーのエリアだけ、stats を渡すとキーごとの取得ページ数などを記録。
+    """
+    # キーの並びは従来どおりジャンル・エリア順、0件のエリアも空リストで返す
+    results: Dict[str, List[Salon]] = {key: [] for key in get_area_keys() if keys is None or key in keys}
+    for key, salon in iter_scan(known, keys, stats):
+        results[key].append(salon)
+    return results
+
+
+def iter_scan(known: Optional[Container[int]] = None, keys: Optional[Container[str]] = None,
+              stats: Optional[Dict[str, Dict]] = None,
+              stop: Optional[threading.Event] = None) -> Iterator[Tuple[str, Salon]]:
+    """scan_all_categories のジェネレータ版（各エリアのスレッドが取得した順に (キー, 店舗) を返す）
+
+    stop がセットされたら、各エリアのスレッドは次のページを取得せずに終わる。
+    """
+    tasks = {}
+    stats = {} if stats is None else stats
     for genre_key, genre_info in GENRES.items():
         for area_code, area_name in AREAS.items():
             key = f"{genre_key}_{area_code}"
-            
-            salons = scan_category(
-                genre_info["prefix"], 
-                area_code, 
-                genre_info["name"], 
-                area_name
-            )
-            all_salons[key] = salons
-            
-            time.sleep(REQUEST_DELAY)
-    
-    return all_salons
+            if keys is not None and key not in keys:
+                continue
+            stats[key] = {}
+            tasks[key] = (genre_info["prefix"], area_code, genre_info["name"], area_name, known, stats[key])
+
+    found: queue.Queue = queue.Queue()
+
+    def scan(key: str, args: Tuple):
+        if stop is not None and stop.is_set():
+            return
+        for salon in iter_category(*args):
+            if stop is not None and stop.is_set():
+                return
+            found.put((key, salon))
+
+    with ThreadPoolExecutor(max_workers=max(1, SCAN_CONCURRENCY)) as executor:
+        futures = [executor.submit(scan, key, args) for key, args in tasks.items()]
+        for future in futures:
+            future.add_done_callback(lambda _: found.put(None))
+        remaining = len(futures)
+        while remaining:
+            item = found.get()
+            if item is None:
+                remaining -= 1
+                continue
+            yield item
+        for future in futures:
+            future.result()  # エリアのスキャン中の例外をここで送出
+
+    fetched = sum(s.get("pages", 0) for s in stats.values())
+    skipped = sum(s.get("skipped", 0) for s in stats.values())
+    print(f"[SCAN] 取得 {fetched}ページ / スキップ {skipped}ページ")
+    cache_stats = get_page_cache().stats
+    print(f"[CACHE] 304: {cache_stats['not_modified']} / 内容同一: {cache_stats['unchanged']} / 解析: {cache_stats['parsed']}")
+
+
+def load_scan_state() -> Dict:
+    """スキャン状態（前回の全件スキャン時刻など）を読み込み"""
+    if os.path.exists(SCAN_STATE_FILE):
+        with open(SCAN_STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_scan_state(state: Dict):
+    """スキャン状態を保存"""
+    atomic_write_json(SCAN_STATE_FILE, state, indent=2)
+
+
+class PollScheduler:
+    """エリアごとの新規掲載のペースから、今回スキャンするエリアを選ぶ
+
+    scan_state の "areas" にキーごとの新規店舗数と観測時間（どちらも POLL_HALF_LIFE_HOURS で
+    減衰させた合計。比が到着率 = 新規店舗数/時になる）と1回あたりの取得ページ数を、
+    "requests" に直近1時間のリクエスト数を記録する。到着率は最初の観測からそのまま使える
+    （0 から徐々に近づけることはしない）。観測が POLL_WARMUP_HOURS に満たないエリア、
+    前回スキャンから今までに出ていそうな新規店舗数が POLL_TARGET_NEW 以上のエリア、
+    または POLL_MAX_INTERVAL_MIN 以上見ていないエリアを、優先度の高い順に
+    POLL_BUDGET_PER_HOUR の残りの範囲で選ぶ。全件スキャンも、前回の全件スキャンのリクエスト数が
+    予算の残りに収まるまで見送る（"sweep_requests" に記録）。
+    """
+
+    def __init__(self, state: Dict):
+        self.state = state
+        self.areas: Dict[str, Dict] = state.setdefault("areas", {})
+        self.requests: List[List[float]] = state.setdefault("requests", [])
+
+    @staticmethod
+    def rate(entry: Dict) -> float:
+        """到着率（新規店舗数/時）"""
+        return entry["new"] / entry["hours"] if entry["hours"] > 0 else 0.0
+
+    def priority(self, key: str, now: float) -> float:
+        """1以上ならスキャン対象（見込み新規数 / POLL_TARGET_NEW と 経過時間 / 最大間隔 の大きい方）"""
+        entry = self.areas.get(key)
+        if entry is None or entry["hours"] < POLL_WARMUP_HOURS:
+            return float("inf")
+        elapsed_hours = max(0.0, now - entry["last_scan"]) / 3600
+        expected = self.rate(entry) * elapsed_hours / POLL_TARGET_NEW if POLL_TARGET_NEW > 0 else float("inf")
+        return max(expected, elapsed_hours * 60 / POLL_MAX_INTERVAL_MIN)
+
+    def spent(self, now: float) -> int:
+        """直近1時間のリクエスト数"""
+        self.requests[:] = [entry for entry in self.requests if entry[0] > now - 3600]
+        return int(sum(count for _, count in self.requests))
+
+    def select(self, keys: Iterable[str], now: Optional[float] = None) -> List[str]:
+        """今回スキャンするキー（優先度順。推定ページ数が予算の残りに収まる分だけ）"""
+        now = time.time() if now is None else now
+        remaining = POLL_BUDGET_PER_HOUR - self.spent(now)
+        priorities = {key: self.priority(key, now) for key in keys}
+        selected = []
+        for key in sorted(priorities, key=priorities.get, reverse=True):
+            if priorities[key] < 1:
+                break
+            cost = self.areas.get(key, {}).get("pages", 1)
+            if cost > remaining:
+                continue
+            selected.append(key)
+            remaining -= cost
+        return selected
+
+    def can_sweep(self, now: Optional[float] = None) -> bool:
+        """全件スキャンを今回行えるか（前回の全件スキャンのリクエスト数が予算の残りに収まるか。
+        1回で予算そのものを超える場合は、直近1時間に他のリクエストがないときだけ行う）"""
+        spent = self.spent(time.time() if now is None else now)
+        return spent == 0 or self.state.get("sweep_requests", 0) <= POLL_BUDGET_PER_HOUR - spent
+
+    def record_sweep(self, count: int):
+        self.state["sweep_requests"] = count
+
+    def record_scan(self, key: str, new_count: Optional[int], pages: int, now: Optional[float] = None):
+        """スキャン結果（前回スキャンからの新規店舗数・取得ページ数）で到着率を更新
+
+        new_count が None（初回実行で全店舗が新規に見える回など）は観測に数えず、時刻だけ進める。
+        """
+        now = time.time() if now is None else now
+        entry = self.areas.get(key)
+        if entry is None:
+            self.areas[key] = {"new": 0.0, "hours": 0.0, "pages": float(pages), "last_scan": now}
+            return
+        if new_count is not None:
+            elapsed_hours = max(now - entry["last_scan"], 1.0) / 3600
+            decay = 0.5 ** (elapsed_hours / POLL_HALF_LIFE_HOURS)
+            entry["new"] = entry["new"] * decay + new_count
+            entry["hours"] = entry["hours"] * decay + elapsed_hours
+        entry["pages"] += 0.3 * (pages - entry["pages"])
+        entry["last_scan"] = now
+
+    def record_requests(self, count: int, now: Optional[float] = None):
+        if count:
+            self.requests.append([time.time() if now is None else now, count])
+
+
+def is_full_sweep_due(state: Dict) -> bool:
+    """全件スキャン（差分スキャンでの取りこぼし確認）が必要か判定"""
+    if SCAN_MODE == "full":
+        return True
+    last = state.get("last_full_sweep")
+    if not last:
+        return True
+    elapsed = datetime.now() - datetime.fromisoformat(last)
+    return elapsed.total_seconds() >= FULL_SWEEP_INTERVAL_HOURS * 3600
 
 
 # ============================================
 # データ管理
 # ============================================
 
-def load_known_salons() -> Dict[str, Set[str]]:
-    """既知の店舗IDを読み込み"""
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return {k: set(v) for k, v in data.items()}
-    return {}
-
+def salon_number(salon_id: str) -> int:
+    """店舗ID（slnH000123456）の数値部分"""
+    return int(salon_id[4:])
+
+
+def salon_id_from_number(number: int) -> str:
+    """数値から店舗IDを復元（HPBの店舗IDは slnH + 9桁）"""
+    return f"slnH{number:09d}"
+
+
+def name_digest(name: str) -> int:
+    """店舗名のCRC32（店舗名の変更検出用。空なら0）"""
+    return zlib.crc32(name.encode("utf-8")) if name else 0
+
+
+@dataclass
+class ListingEvent:
+    """掲載の変化（added: エリアに追加 / removed: 掲載終了 / renamed: 店舗名変更 / relisted: 再掲載）
+
+    kind・key・salon_id は保存形式によらず同じ。SalonIndex（snapshot / json）は店舗名を CRC でしか
+    持たないので、renamed の old_name と、今回の一覧に出てこなかった店舗の removed の name は空になる
+    （SalonStore は保存している店舗名を入れる）。
+    """
+    kind: str
+    key: str
+    salon_id: str
+    name: str = ""
+    old_name: str = ""
+
+
+class SalonIndex:
+    """既知店舗のグローバル索引
+
+    店舗IDの数値部分をソート済み array('Q') に持ち、同じ位置の array('Q') に
+    掲載中のエリアキーのビットマスク、array('I') に最終確認時刻（エポック秒）と
+    店舗名のCRC32（0は不明）を持つ。更新は apply() でまとめて行い、配列を作り直す。
+    エリアをまたいでも1店舗1エントリ。
+    マスクが0の店舗は掲載終了（期限切れで削除されるまでは既知として扱う）。
+    """
+
+    SEEN_RESOLUTION = 3600  # 最終確認時刻はこの秒数ごとにしか更新しない（毎回保存し直さないため）
+
+    def __init__(self):
+        self.ids = array("Q")
+        self.masks = array("Q")
+        self.seen = array("I")
+        self.digests = array("I")
+        self.area_keys: List[str] = []
+        self.dirty = False  # 前回の保存以降に変更があったか
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, salon_id: Union[str, int]) -> bool:
+        """登録済みか（店舗IDでも数値部分でも可）"""
+        number = salon_id if isinstance(salon_id, int) else salon_number(salon_id)
+        return self._position(number) >= 0
+
+    def _position(self, number: int) -> int:
+        i = bisect_left(self.ids, number)
+        if i < len(self.ids) and self.ids[i] == number:
+            return i
+        return -1
+
+    def _area_bit(self, key: str) -> int:
+        if key not in self.area_keys:
+            if len(self.area_keys) >= 64:
+                raise ValueError(f"エリアキーが多すぎます: {key}")
+            self.area_keys.append(key)
+        return 1 << self.area_keys.index(key)
+
+    def _assign(self, items: List[Tuple[int, int, int, int]]):
+        """（ID, マスク, 最終確認, 店舗名CRC）のソート済みリストで配列を置き換える"""
+        self.ids = array("Q", [item[0] for item in items])
+        self.masks = array("Q", [item[1] for item in items])
+        self.seen = array("I", [item[2] for item in items])
+        self.digests = array("I", [item[3] for item in items])
+
+    def find_new(self, current: Dict[str, List[Salon]]) -> List[Salon]:
+        """どのエリアにも未登録の店舗（今回の結果内の重複も1件にまとめる）"""
+        new_salons = []
+        seen = set()
+        for salons in current.values():
+            for salon in salons:
+                if salon.number in seen or salon.id in self:
+                    continue
+                seen.add(salon.number)
+                new_salons.append(salon)
+        return new_salons
+
+    def apply(self, current: Dict[str, List[Salon]], complete_keys: Container[str] = (),
+              now: Optional[float] = None) -> List[ListingEvent]:
+        """今回の一覧を反映して掲載の変化を返す（ソート済み配列を1回走査するマージ）
+
+        掲載終了は complete_keys（最後のページまで取得できたエリア）だけで判定する。
+        """
+        now = int(time.time() if now is None else now)
+        # 今回の店舗を ID ごとに1件へ（複数エリアならビットを重ねる）
+        scanned: Dict[int, list] = {}
+        for key, salons in current.items():
+            bit = self._area_bit(key)
+            for salon in salons:
+                entry = scanned.get(salon.number)
+                if entry is None:
+                    scanned[salon.number] = [bit, name_digest(salon.name), salon]
+                else:
+                    entry[0] |= bit
+        complete = 0
+        for key in complete_keys:
+            if key in self.area_keys:
+                complete |= 1 << self.area_keys.index(key)
+
+        events: List[ListingEvent] = []
+        items = []
+        touched = False
+        for number, mask, last_seen, digest in zip(self.ids, self.masks, self.seen, self.digests):
+            entry = scanned.pop(number, None)
+            if entry is None:
+                gone = mask & complete
+                if gone:
+                    events.extend(self._events("removed", number, gone))
+                    mask &= ~gone
+                items.append((number, mask, last_seen, digest))
+                continue
+            found, found_digest, salon = entry
+            gone = mask & complete & ~found
+            if gone:
+                events.extend(self._events("removed", number, gone, salon.name))
+            if not mask:
+                events.extend(self._events("relisted", number, found, salon.name))
+            elif found & ~mask:
+                events.extend(self._events("added", number, found & ~mask, salon.name))
+            if digest and found_digest and digest != found_digest:
+                events.append(ListingEvent("renamed", self._first_key(found), salon.id, salon.name))
+            if now - last_seen >= self.SEEN_RESOLUTION or (found_digest and found_digest != digest):
+                last_seen, digest, touched = now, found_digest or digest, True
+            items.append((number, (mask & ~gone) | found, last_seen, digest))
+        if scanned:
+            for number, (found, found_digest, salon) in scanned.items():
+                events.extend(self._events("added", number, found, salon.name))
+                items.append((number, found, now, found_digest))
+            items.sort()
+        self._assign(items)
+        self.dirty = self.dirty or touched or bool(events)
+        return events
+
+    def _events(self, kind: str, number: int, mask: int, name: str = "") -> Iterator[ListingEvent]:
+        salon_id = salon_id_from_number(number)
+        for bit, key in enumerate(self.area_keys):
+            if mask >> bit & 1:
+                yield ListingEvent(kind, key, salon_id, name)
+
+    def _first_key(self, mask: int) -> str:
+        return self.area_keys[(mask & -mask).bit_length() - 1]
+
+    def expire(self, cutoff: float) -> int:
+        """最終確認が cutoff（エポック秒）より前の店舗を削除して件数を返す"""
+        keep = [i for i, last_seen in enumerate(self.seen) if last_seen >= cutoff]
+        expired = len(self.ids) - len(keep)
+        if expired:
+            self._assign([(self.ids[i], self.masks[i], self.seen[i], self.digests[i]) for i in keep])
+            self.dirty = True
+        return expired
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        """エリアキー → 店舗ID一覧（known_salons.json 形式）"""
+        data: Dict[str, List[str]] = {key: [] for key in self.area_keys}
+        for number, mask in zip(self.ids, self.masks):
+            salon_id = salon_id_from_number(number)
+            for bit, key in enumerate(self.area_keys):
+                if mask >> bit & 1:
+                    data[key].append(salon_id)
+        return data
+
+    @classmethod
+    def from_numbers(cls, areas: Dict[str, Iterable[int]]) -> "SalonIndex":
+        index = cls()
+        masks: Dict[int, int] = {}
+        for key, numbers in areas.items():
+            bit = index._area_bit(key)
+            numbers = list(numbers)
+            # 複数エリアに所属する店舗だけビットを重ねる（それ以外は dict 操作を一括で）
+            shared = {number: masks[number] | bit for number in masks.keys() & numbers}
+            masks.update(dict.fromkeys(numbers, bit))
+            masks.update(shared)
+        numbers = sorted(masks)
+        index.ids = array("Q", numbers)
+        index.masks = array("Q", map(masks.__getitem__, numbers))
+        index.seen = array("I", [int(time.time())]) * len(numbers)  # 最終確認を持たない形式は読み込み時から数える
+        index.digests = array("I", bytes(4 * len(numbers)))
+        return index
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, List[str]]) -> "SalonIndex":
+        return cls.from_numbers({key: map(salon_number, salon_ids) for key, salon_ids in data.items()})
+
+
+# スナップショット形式: ヘッダ（マジック・バージョン・CRC32・本体長）+ zlib 圧縮した本体
+# 本体は「キー数・（キー長・キー）…・店舗数」のあとに、ソート済みIDの差分（uint64）・
+# エリアマスク（uint64）・最終確認（uint32）・店舗名CRC（uint32）を列ごとに並べたもの（すべて LE）
+SNAPSHOT_MAGIC = b"HPSN"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sHII")
+SNAPSHOT_COUNT = struct.Struct("<I")
+SNAPSHOT_KEY = struct.Struct("<H")
+
+
+def write_snapshot(path: str, index: SalonIndex):
+    """既知店舗をバイナリスナップショットとして保存"""
+    chunks = [SNAPSHOT_KEY.pack(len(index.area_keys))]
+    for key in index.area_keys:
+        key_bytes = key.encode("utf-8")
+        chunks.append(SNAPSHOT_KEY.pack(len(key_bytes)) + key_bytes)
+    chunks.append(SNAPSHOT_COUNT.pack(len(index.ids)))
+    deltas = array("Q", [b - a for a, b in zip(chain((0,), index.ids), index.ids)])
+    for column in (deltas, array("Q", index.masks), array("I", index.seen), array("I", index.digests)):
+        if sys.byteorder != "little":
+            column.byteswap()
+        chunks.append(column.tobytes())
+    payload = zlib.compress(b"".join(chunks), 9)
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, zlib.crc32(payload), len(payload))
+    atomic_write(path, header + payload)
+
+
+def read_snapshot(path: str) -> SalonIndex:
+    """スナップショットを読み込み（旧形式のJSONなら自動判別して読み込む）。壊れていれば ValueError"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(SNAPSHOT_MAGIC):
+        return SalonIndex.from_dict(json.loads(data.decode("utf-8")))
+    if len(data) < SNAPSHOT_HEADER.size:
+        raise ValueError(f"スナップショットが途中で切れています: {path}")
+
+    magic, version, crc, length = SNAPSHOT_HEADER.unpack_from(data)
+    payload = data[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + length]
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"未対応のスナップショットバージョン: {version}")
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        raise ValueError(f"スナップショットが破損しています: {path}")
 
-def save_known_salons(salons: Dict[str, Set[str]]):
-    """既知の店舗IDを保存"""
-    data = {k: list(v) for k, v in salons.items()}
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    try:
+        return _read_snapshot_body(zlib.decompress(payload))
+    except (zlib.error, struct.error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"スナップショットが破損しています: {path}（{e}）") from e
+
+
+def _read_snapshot_body(body: bytes) -> SalonIndex:
+    index = SalonIndex()
+    key_count, = SNAPSHOT_KEY.unpack_from(body)
+    offset = SNAPSHOT_KEY.size
+    for _ in range(key_count):
+        key_length, = SNAPSHOT_KEY.unpack_from(body, offset)
+        offset += SNAPSHOT_KEY.size
+        index.area_keys.append(body[offset:offset + key_length].decode("utf-8"))
+        offset += key_length
+    count, = SNAPSHOT_COUNT.unpack_from(body, offset)
+    offset += SNAPSHOT_COUNT.size
+    columns = []
+    for typecode in ("Q", "Q", "I", "I"):
+        column = array(typecode)
+        size = count * column.itemsize
+        column.frombytes(body[offset:offset + size])
+        if sys.byteorder != "little":
+            column.byteswap()
+        offset += size
+        columns.append(column)
+    if offset != len(body):
+        raise ValueError(f"本体の長さが合いません（{offset} != {len(body)}）")
+    deltas, index.masks, index.seen, index.digests = columns
+    index.ids = array("Q", accumulate(deltas))
+    return index
+
+
+class SalonStore:
+    """既知店舗の SQLite ストア（WALモード。差分検出・一括更新をSQLで行う）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS salons (
+                id TEXT NOT NULL,
+                area_key TEXT NOT NULL,
+                name TEXT,
+                phone TEXT,
+                first_seen TEXT,
+                last_seen TEXT,
+                status TEXT NOT NULL DEFAULT 'active',
+                PRIMARY KEY (area_key, id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_salons_id ON salons (id);
+        """)
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM salons").fetchone()[0]
+
+    def __contains__(self, salon_id: Union[str, int]) -> bool:
+        """どこかのエリアに登録済みか（id インデックスで判定。店舗IDでも数値部分でも可）"""
+        if isinstance(salon_id, int):
+            salon_id = salon_id_from_number(salon_id)
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM salons WHERE id = ? LIMIT 1", (salon_id,)).fetchone()
+        return row is not None
+
+    def find_new(self, current: Dict[str, List[Salon]]) -> List[Salon]:
+        """どのエリアにも未登録の店舗（一時テーブルとの差集合。今回の結果内の重複も1件にまとめる）"""
+        salons_by_id: Dict[str, Salon] = {}
+        for salons in current.values():
+            for salon in salons:
+                salons_by_id.setdefault(salon.id, salon)
+        with self.lock:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS current_ids (id TEXT)")
+            self.conn.execute("DELETE FROM current_ids")
+            self.conn.executemany("INSERT INTO current_ids VALUES (?)", ((salon_id,) for salon_id in salons_by_id))
+            rows = self.conn.execute("""
+                SELECT c.id FROM current_ids c
+                WHERE NOT EXISTS (SELECT 1 FROM salons s WHERE s.id = c.id)
+                ORDER BY c.rowid
+            """).fetchall()
+            self.conn.execute("DELETE FROM current_ids")
+        return [salons_by_id[salon_id] for salon_id, in rows]
+
+    def apply(self, current: Dict[str, List[Salon]], complete_keys: Container[str] = (),
+              now: Optional[float] = None) -> List[ListingEvent]:
+        """今回の店舗を一括登録して掲載の変化を返す（一時テーブルとの差分。既存は店舗名・最終確認日時を更新）
+
+        掲載終了は complete_keys（最後のページまで取得できたエリア）だけで判定し、行は消さずに
+        status を removed にする。どのエリアでも掲載終了の店舗が再び現れたら再掲載とする。
+        """
+        now_text = datetime.fromtimestamp(time.time() if now is None else now).isoformat(timespec="seconds")
+        rows = [(key, salon.id, salon.name, salon.phone or None) for key, salons in current.items() for salon in salons]
+        events: List[ListingEvent] = []
+        with self.lock, self.conn:
+            conn = self.conn
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS scan_rows "
+                         "(area_key TEXT, id TEXT, name TEXT, phone TEXT, PRIMARY KEY (area_key, id))")
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS complete_keys (area_key TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM scan_rows")
+            conn.execute("DELETE FROM complete_keys")
+            conn.executemany("INSERT OR IGNORE INTO scan_rows VALUES (?, ?, ?, ?)", rows)
+            conn.executemany("INSERT OR IGNORE INTO complete_keys VALUES (?)", ((key,) for key in complete_keys))
+
+            for key, salon_id, name, known, active in conn.execute("""
+                SELECT c.area_key, c.id, c.name,
+                       EXISTS (SELECT 1 FROM salons k WHERE k.id = c.id),
+                       EXISTS (SELECT 1 FROM salons a WHERE a.id = c.id AND a.status = 'active')
+                FROM scan_rows c
+                LEFT JOIN salons s ON s.area_key = c.area_key AND s.id = c.id
+                WHERE s.id IS NULL OR s.status != 'active'
+            """).fetchall():
+                events.append(ListingEvent("relisted" if known and not active else "added", key, salon_id, name))
+
+            renamed = set()
+            for key, salon_id, name, old_name in conn.execute("""
+                SELECT c.area_key, c.id, c.name, s.name FROM scan_rows c
+                JOIN salons s ON s.area_key = c.area_key AND s.id = c.id
+                WHERE c.name != '' AND s.name IS NOT NULL AND s.name != '' AND s.name != c.name
+            """).fetchall():
+                if salon_id not in renamed:
+                    renamed.add(salon_id)
+                    events.append(ListingEvent("renamed", key, salon_id, name, old_name))
+
+            removed = conn.execute("""
+                SELECT s.area_key, s.id, s.name FROM salons s
+                JOIN complete_keys k ON k.area_key = s.area_key
+                WHERE s.status = 'active'
+                  AND NOT EXISTS (SELECT 1 FROM scan_rows c WHERE c.area_key = s.area_key AND c.id = s.id)
+            """).fetchall()
+            conn.executemany("UPDATE salons SET status = 'removed' WHERE area_key = ? AND id = ?",
+                             ((key, salon_id) for key, salon_id, _ in removed))
+            events.extend(ListingEvent("removed", key, salon_id, name or "") for key, salon_id, name in removed)
+
+            conn.execute("""
+                INSERT INTO salons (id, area_key, name, phone, first_seen, last_seen)
+                SELECT id, area_key, name, phone, ?1, ?1 FROM scan_rows WHERE true
+                ON CONFLICT (area_key, id) DO UPDATE SET
+                    name = excluded.name,
+                    phone = COALESCE(excluded.phone, salons.phone),
+                    last_seen = excluded.last_seen,
+                    status = 'active'
+            """, (now_text,))
+            conn.execute("DELETE FROM scan_rows")
+            conn.execute("DELETE FROM complete_keys")
+        return events
+
+    def expire(self, cutoff: float) -> int:
+        """どのエリアでも最終確認が cutoff（エポック秒）より前の店舗を削除して店舗数を返す
+
+        最終確認の無い行（旧形式から移行した行）は、ここから期限を数え始める。
+        """
+        now_text = datetime.now().isoformat(timespec="seconds")
+        cutoff_text = datetime.fromtimestamp(cutoff).isoformat(timespec="seconds")
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE salons SET last_seen = ? WHERE last_seen IS NULL", (now_text,))
+            expired = [row for row in self.conn.execute(
+                "SELECT id FROM salons GROUP BY id HAVING MAX(last_seen) < ?", (cutoff_text,))]
+            self.conn.executemany("DELETE FROM salons WHERE id = ?", expired)
+            return len(expired)
+
+    def import_json(self, path: str) -> int:
+        """旧形式（known_salons.json）から移行"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        rows = [(salon_id, key) for key, ids in data.items() for salon_id in ids]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO salons (id, area_key) VALUES (?, ?)", rows
+            )
+        return len(rows)
 
+    def checkpoint(self):
+        """WALをDB本体に書き戻す（アーティファクトを1ファイルにするため）"""
+        with self.lock:
+            self.conn.commit()
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
 
-def find_new_salons(current: Dict[str, List[Dict]], known: Dict[str, Set[str]]) -> List[Dict]:
-    """新規店舗を検出"""
-    new_salons = []
+    def close(self):
+        self.checkpoint()
+        with self.lock:
+            self.conn.close()
 
-    for key, salons in current.items():
-        known_ids = known.get(key, set())
 
-        for salon in salons:
-            if salon["id"] not in known_ids:
-                new_salons.append(salon)
+KnownSalons = Union[SalonIndex, SalonStore]
 
-    return new_salons
 
+def load_known_salons() -> KnownSalons:
+    """既知の店舗を読み込み（STATE_BACKEND=sqlite なら SalonStore、snapshot / json なら SalonIndex）"""
+    if STATE_BACKEND == "sqlite":
+        store = SalonStore(DB_FILE)
+        if len(store) == 0 and os.path.exists(DATA_FILE):
+            count = store.import_json(DATA_FILE)
+            if count:
+                print(f"[INFO] {DATA_FILE} から {count} 件を {DB_FILE} に移行しました")
+        return store
 
-def update_known_salons(current: Dict[str, List[Dict]], known: Dict[str, Set[str]]) -> Dict[str, Set[str]]:
-    """既知リストを更新"""
-    for key, salons in current.items():
-        if key not in known:
-            known[key] = set()
-        for salon in salons:
-            known[key].add(salon["id"])
-    return known
+    if STATE_BACKEND == "snapshot" and os.path.exists(SNAPSHOT_FILE):
+        try:
+            return read_snapshot(SNAPSHOT_FILE)
+        except ValueError as e:
+            # 壊れたファイルで以後の実行がすべて止まらないよう、退避して初回実行として作り直す
+            # （古い known_salons.json には戻さない。初回は通知しないので、その間の新規店舗を一斉に通知しない）
+            corrupt_file = f"{SNAPSHOT_FILE}.corrupt"
+            os.replace(SNAPSHOT_FILE, corrupt_file)
+            print(f"[ERROR] {e} - {corrupt_file} に退避し、既知店舗を一覧から作り直します")
+            return SalonIndex()
+    if os.path.exists(DATA_FILE):
+        with open(DATA_FILE, "r", encoding="utf-8") as f:
+            index = SalonIndex.from_dict(json.load(f))
+        index.dirty = STATE_BACKEND == "snapshot"  # JSON から移行したら次の保存でスナップショットを作る
+        return index
+    return SalonIndex()
+
+
+def save_known_salons(salons: KnownSalons):
+    """既知の店舗を保存（SalonIndex は変更があったときだけ書き出す）"""
+    if isinstance(salons, SalonStore):
+        salons.checkpoint()
+        return
+    if not salons.dirty:
+        return
+    if STATE_BACKEND == "snapshot":
+        write_snapshot(SNAPSHOT_FILE, salons)
+    else:
+        atomic_write_json(DATA_FILE, salons.to_dict(), indent=2)
+    salons.dirty = False
+
+
+def find_new_salons(current: Dict[str, List[Salon]], known: KnownSalons) -> List[Salon]:
+    """新規店舗を検出（どのエリアでも未登録の店舗のみ）"""
+    return known.find_new(current)
+
+
+def update_known_salons(current: Dict[str, List[Salon]], known: KnownSalons,
+                        complete_keys: Container[str] = ()) -> List[ListingEvent]:
+    """既知リストを更新して掲載の変化を返す（掲載終了は complete_keys のエリアだけで判定）"""
+    return known.apply(current, complete_keys)
+
+
+def complete_scan_keys(scan_stats: Dict[str, Dict], current: Dict[str, List[Salon]]) -> Set[str]:
+    """最後のページまで取得できたエリアキー
+
+    差分スキャンで打ち切ったエリア・取得に失敗したエリアは、見えていない店舗を
+    掲載終了と区別できないので除く。0件のエリアもページ構成の変化を疑って除く。
+    """
+    return {
+        key for key, stats in scan_stats.items()
+        if current.get(key) and not stats.get("skipped") and stats.get("pages", 0) >= stats.get("total_pages", 1)
+    }
+
+
+def expire_known_salons(known: KnownSalons) -> int:
+    """KNOWN_TTL_DAYS を過ぎても一覧に現れない店舗を既知リストから削除"""
+    if KNOWN_TTL_DAYS <= 0:
+        return 0
+    return known.expire(time.time() - KNOWN_TTL_DAYS * 86400)
+
+
+class RunJournal:
+    """1回の実行の進捗ログ（JSON Lines の追記のみ）
+
+    電話番号を取得した新規店舗を1件ずつ、スプシ追加・通知を成功ごとに追記する。
+    既知店舗の保存まで終わったら、スプシ追加・通知が済んでいない店舗だけを残して書き直す
+    （すべて済んでいれば削除）。残っていれば、前回は途中で止まったか送れなかった分がある。
+    次の実行では記録済みの電話番号を使ってその分を送り直し、済んだ分はやり直さない。
+    """
+
+    STEPS = ("sheet", "notify")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.salons: Dict[str, Salon] = {}
+        self.keys: Dict[str, str] = {}
+        self.done: Dict[str, Set[str]] = {step: set() for step in self.STEPS}
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            self._replay()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def __len__(self) -> int:
+        return len(self.salons)
+
+    def _replay(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 書き込み途中で止まった行
+                if record["type"] == "detected":
+                    salon = Salon.from_dict(record["salon"])
+                    self.salons[salon.id] = salon
+                    self.keys[salon.id] = record["key"]
+                elif record["type"] in self.done:
+                    self.done[record["type"]].update(record["ids"])
+
+    def _append(self, record: Dict, sync: bool = False):
+        with self.lock:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+            if sync:
+                os.fsync(self.file.fileno())
+
+    def resumable(self) -> List[Tuple[str, Salon]]:
+        """前回止まった実行で、スプシ追加か通知が済んでいない (キー, 店舗)（電話番号は記録済み）"""
+        return [
+            (self.keys[salon_id], salon) for salon_id, salon in self.salons.items()
+            if not all(salon_id in self.done[step] for step in self.STEPS)
+        ]
+
+    def fold_into(self, current: Dict[str, List[Salon]]):
+        """済んだ店舗は今回のスキャン結果になくても current に加え（既知リストに確実に入れる）、
+        済んでいない店舗は current から除く（送れるまで既知にせず、次の実行で送り直す）"""
+        unfinished = {salon.id for _, salon in self.resumable()}
+        if unfinished:
+            for key, salons in current.items():
+                current[key] = [salon for salon in salons if salon.id not in unfinished]
+        current_ids = {salon.id for salons in current.values() for salon in salons}
+        for salon_id, salon in self.salons.items():
+            if salon_id not in current_ids and salon_id not in unfinished:
+                current.setdefault(self.keys[salon_id], []).append(salon)
+
+    def record(self, salon: Salon, key: str):
+        """電話番号を取得した新規店舗を記録"""
+        with self.lock:
+            self.salons[salon.id] = salon
+            self.keys[salon.id] = key
+        self._append({"type": "detected", "key": key, "salon": salon.to_dict()})
+
+    def pending(self, step: str, salons: List[Salon]) -> List[Salon]:
+        """step がまだ済んでいない店舗"""
+        return [salon for salon in salons if salon.id not in self.done[step]]
+
+    def mark(self, step: str, salons: List[Salon]):
+        """step（スプシ追加・通知）の完了を記録（次の外部送信より前にディスクへ書き出す）"""
+        ids = [salon.id for salon in salons]
+        self.done[step].update(ids)
+        self._append({"type": step, "ids": ids}, sync=True)
+
+    def sync(self):
+        with self.lock:
+            os.fsync(self.file.fileno())
+
+    def release(self):
+        """途中で失敗したときはファイルを閉じるだけ（書き直さず、次の実行でそのまま再開する）"""
+        with self.lock:
+            self.file.close()
+
+    def close(self) -> int:
+        """既知店舗の保存が終わったら、済んでいない店舗だけを残して書き直す（なければ削除）。残した件数を返す"""
+        unfinished = self.resumable()
+        with self.lock:
+            self.file.close()
+            if not unfinished:
+                os.remove(self.path)
+                return 0
+            records = [{"type": "detected", "key": key, "salon": salon.to_dict()} for key, salon in unfinished]
+            for step in self.STEPS:
+                ids = [salon.id for _, salon in unfinished if salon.id in self.done[step]]
+                if ids:
+                    records.append({"type": step, "ids": ids})
+            atomic_write(self.path, "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8"))
+            return len(unfinished)
 
 
 # ============================================
 # Google Sheets連携
 # ============================================
 
+_sheets_client = None
+
+
 def get_sheets_client():
-    """Google Sheets APIクライアントを取得"""
+    """Google Sheets APIクライアントを取得（認証は初回のみ。常駐モードでは使い回す）"""
+    global _sheets_client
+    if _sheets_client is not None:
+        return _sheets_client
+
+    # gspread と Google認証は重いので、スプシに書くときに初めて読み込む
+    import gspread
+    from google.oauth2.service_account import Credentials
+
     # 環境変数から認証情報を取得（GitHub Actions用）
     creds_json = os.environ.get("GOOGLE_CREDENTIALS_JSON")
 
@@ -320,137 +1979,774 @@ def get_sheets_client():
         print("[WARN] Google認証情報が見つかりません。スプシ連携をスキップします。")
         return None
 
-    return gspread.authorize(credentials)
+    _sheets_client = gspread.authorize(credentials)
+    return _sheets_client
 
 
 def get_existing_salon_ids(worksheet) -> Set[str]:
-    """スプレッドシートから既存の店舗IDを取得"""
+    """スプレッドシートから既存の店舗IDを取得（A列のローカルミラーを差分だけ読んで更新）"""
+    sink = get_sheets_sink()
     try:
-        all_values = worksheet.get_all_values()
-        if len(all_values) <= 1:  # ヘッダーのみ
-            return set()
-        # A列（店舗ID）を取得
-        return {row[0] for row in all_values[1:] if row[0]}
+        with sink.lock:
+            sink.refresh_index(worksheet)
+            return set(sink.index_ids)
     except Exception as e:
         print(f"[ERROR] 既存店舗ID取得失敗: {e}")
         return set()
 
 
-def append_salons_to_sheet(new_salons: List[Dict]) -> bool:
-    """新規店舗をスプレッドシートに追加"""
-    if not new_salons:
-        return True
+class SheetsSink:
+    """スプレッドシートへの書き込み（認証・ワークシート取得・ヘッダー確認はプロセスで1回だけ）
 
-    client = get_sheets_client()
-    if not client:
-        return False
+    行はバッファに貯めて SHEET_APPEND_ROWS 行ずつ append_rows で送る。書き込み上限（429）や
+    5xx はバックオフして再試行し、それでも送れなかった行はバッファに残して次回まとめて送る
+    （プロセスが終わってもその店舗は進捗ログに残り、次の実行で送り直される）。
 
-    try:
-        spreadsheet = client.open_by_key(SPREADSHEET_ID)
+    A列（店舗ID）は SHEET_INDEX_FILE にミラーを持ち、書き込み前に前回の行数より後ろだけを
+    読んで追いつかせる。シートに既にある店舗IDの行は書かない（状態ファイルを失っても重複しない）。
+    """
 
-        # シートを取得または作成
+    def __init__(self):
+        self.worksheet = None
+        self.rows: List[List[str]] = []
+        self.lock = threading.Lock()
+        self.index_ids: Set[str] = set()
+        self.index_rows = 0  # ミラー済みの行数（ヘッダー行を含む）
+        self.index_last = ""  # ミラー済みの最終行のA列（行の削除・並べ替えの検出用）
+        self.index_dirty = False
+        self.load_index()
+
+    def load_index(self):
+        if not os.path.exists(SHEET_INDEX_FILE):
+            return
+        try:
+            with open(SHEET_INDEX_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] スプシ店舗IDミラー読み込み失敗（作り直します）: {e}")
+            return
+        if data.get("spreadsheet") != SPREADSHEET_ID or data.get("sheet") != SHEET_NAME:
+            return
+        self.index_ids = set(data["ids"])
+        self.index_rows = data["rows"]
+        self.index_last = data["last"]
+
+    def save_index(self):
+        """ミラーを保存（変更がなければ何もしない）"""
+        with self.lock:
+            if not self.index_dirty:
+                return
+            atomic_write_json(SHEET_INDEX_FILE, {
+                "spreadsheet": SPREADSHEET_ID, "sheet": SHEET_NAME,
+                "rows": self.index_rows, "last": self.index_last, "ids": sorted(self.index_ids),
+            }, separators=(",", ":"))
+            self.index_dirty = False
+
+    def refresh_index(self, worksheet):
+        """ミラーをシートに追いつかせる（前回の最終行の確認と、それより後ろの読み込みを1回の呼び出しで）"""
+        if self.index_rows:
+            last, added = self.call(worksheet.batch_get, [f"A{self.index_rows}", f"A{self.index_rows + 1}:A"])
+            if (last[0][0] if last and last[0] else "") == self.index_last:
+                values = [row[0] if row else "" for row in added]
+                self._extend_index(values)
+                return
+            print("[INFO] スプシの行が削除・並べ替えされたため、店舗IDミラーを作り直します")
+        self.index_ids, self.index_rows, self.index_last = set(), 0, ""
+        self._extend_index(self.call(worksheet.col_values, 1))
+
+    def _extend_index(self, values: List[str]):
+        if not values:
+            return
+        self.index_ids.update(value for value in values if value and value != SHEET_HEADERS[0])
+        self.index_rows += len(values)
+        self.index_last = values[-1]
+        self.index_dirty = True
+
+    def open(self):
+        """ワークシートを取得（なければ作成、ヘッダーがなければ追加）。認証情報がなければ None"""
+        if self.worksheet is not None:
+            return self.worksheet
+        import gspread
+        client = get_sheets_client()
+        if not client:
+            return None
+
+        spreadsheet = self.call(client.open_by_key, SPREADSHEET_ID)
         try:
-            worksheet = spreadsheet.worksheet(SHEET_NAME)
+            worksheet = self.call(spreadsheet.worksheet, SHEET_NAME)
         except gspread.WorksheetNotFound:
-            worksheet = spreadsheet.add_worksheet(title=SHEET_NAME, rows=1000, cols=10)
-            # ヘッダーを追加
-            headers = ["店舗ID", "店舗名", "電話番号", "URL", "エリア", "ジャンル", "検出日時", "ステータス"]
-            worksheet.append_row(headers)
+            worksheet = self.call(spreadsheet.add_worksheet, title=SHEET_NAME, rows=1000, cols=10)
+            self.call(worksheet.append_row, SHEET_HEADERS)
             print(f"[INFO] シート '{SHEET_NAME}' を新規作成しました")
-
-        # ヘッダーがなければ追加
-        first_row = worksheet.row_values(1)
-        if not first_row or first_row[0] != "店舗ID":
-            headers = ["店舗ID", "店舗名", "電話番号", "URL", "エリア", "ジャンル", "検出日時", "ステータス"]
-            worksheet.insert_row(headers, 1)
-
-        # 新規店舗を追加
+        else:
+            # ヘッダーがなければ追加
+            first_row = self.call(worksheet.row_values, 1)
+            if not first_row or first_row[0] != SHEET_HEADERS[0]:
+                self.call(worksheet.insert_row, SHEET_HEADERS, 1)
+        self.worksheet = worksheet
+        return worksheet
+
+    @staticmethod
+    def call(func: Callable, *args, **kwargs):
+        """Sheets API 呼び出し（書き込み上限・一時的なエラーはバックオフして再試行）"""
+        import gspread
+        for attempt in range(SHEET_RETRIES + 1):
+            try:
+                return func(*args, **kwargs)
+            except gspread.exceptions.APIError as e:
+                status = e.response.status_code
+                if status not in SHEET_RETRY_STATUS or attempt >= SHEET_RETRIES:
+                    raise
+                wait = retry_after_seconds(e.response) or backoff_delay(attempt, SHEET_RETRY_BACKOFF)
+                print(f"[RETRY] Sheets API {status} - {wait:.0f}秒待機")
+                get_metrics().inc("sheet_retries", status=status)
+                time.sleep(wait)
+
+    def add(self, new_salons: List[Salon]):
         now = datetime.now().strftime("%Y/%m/%d %H:%M")
-        rows_to_add = []
-
-        for salon in new_salons:
-            row = [
-                salon["id"],
-                salon.get("name", ""),
-                salon.get("phone", ""),
-                salon.get("url", ""),
-                salon.get("area", ""),
-                salon.get("genre", ""),
-                now,
-                "🆕 NEW"  # 新規追加マーク
-            ]
-            rows_to_add.append(row)
-
-        # バッチで追加（効率化）
-        if rows_to_add:
-            worksheet.append_rows(rows_to_add)
-            print(f"[OK] スプレッドシートに {len(rows_to_add)} 件追加しました")
-
+        with self.lock:
+            for salon in new_salons:
+                self.rows.append([
+                    salon.id,
+                    salon.name,
+                    salon.phone or "",
+                    salon.url,
+                    salon.area,
+                    salon.genre,
+                    now,
+                    "🆕 NEW"  # 新規追加マーク
+                ])
+
+    def flush(self) -> bool:
+        """バッファの行をすべて書き込む（シートに既にある店舗IDは除く。送れた分はバッファから消す）"""
+        with self.lock:
+            worksheet = self.open()
+            if worksheet is None:
+                return False
+            self.refresh_index(worksheet)
+            rows, seen = [], set()
+            for row in self.rows:
+                if row[0] not in self.index_ids and row[0] not in seen:
+                    seen.add(row[0])
+                    rows.append(row)
+            if len(rows) < len(self.rows):
+                print(f"[INFO] スプレッドシートに既にある {len(self.rows) - len(rows)} 件はスキップ")
+            self.rows = rows
+
+            written = 0
+            while self.rows:
+                batch = self.rows[:SHEET_APPEND_ROWS]
+                self.call(worksheet.append_rows, batch)
+                del self.rows[:len(batch)]
+                self._extend_index([row[0] for row in batch])
+                written += len(batch)
+            if written:
+                print(f"[OK] スプレッドシートに {written} 件追加しました")
+            return True
+
+
+_sheets_sink: Optional[SheetsSink] = None
+
+
+def get_sheets_sink() -> SheetsSink:
+    """共有スプレッドシート書き込みを取得"""
+    global _sheets_sink
+    with _http_client_lock:
+        if _sheets_sink is None:
+            _sheets_sink = SheetsSink()
+        return _sheets_sink
+
+
+def append_salons_to_sheet(new_salons: List[Salon]) -> bool:
+    """新規店舗をスプレッドシートに追加（認証情報がなくスプシ連携をしない場合も True）"""
+    if not new_salons:
         return True
 
+    sink = get_sheets_sink()
+    metrics = get_metrics()
+    try:
+        with metrics.timer("sheet_append", {"rows": len(new_salons)}):
+            if sink.open() is None:
+                metrics.inc("sheet_appends", result="skipped")
+                return True
+            sink.add(new_salons)
+            ok = sink.flush()
     except Exception as e:
         print(f"[ERROR] スプレッドシート更新失敗: {e}")
-        return False
+        ok = False
+    metrics.inc("sheet_appends", result="ok" if ok else "failed")
+    if ok:
+        metrics.inc("sheet_rows", len(new_salons))
+    return ok
 
 
 # ============================================
 # Chatwork通知
 # ============================================
 
+class ChatworkDispatcher:
+    """Chatwork への投稿（送信間隔の調整・API残り回数の監視・リトライ・店舗ID単位の重複排除）"""
+
+    def __init__(self):
+        self.bucket = TokenBucket(CHATWORK_MESSAGE_RATE, CHATWORK_MESSAGE_BURST)
+        self.resume_at = 0.0  # API の残り回数が尽きたとき、次に送れる時刻（epoch秒）
+        self.sent_ids: Set[str] = set()
+
+    def wait_quota(self):
+        """残り回数が尽きていればリセットまで待ち、投稿ペースのトークンを取る"""
+        delay = min(self.resume_at - time.time(), RATE_LIMIT_MAX_WAIT)
+        if delay > 0:
+            print(f"[CHATWORK] API残り回数なし - {delay:.0f}秒待機")
+            time.sleep(delay)
+        self.bucket.acquire()
+
+    def track_quota(self, response: requests.Response):
+        """X-RateLimit-Remaining / X-RateLimit-Reset を読んで次に送れる時刻を記録"""
+        remaining = response.headers.get("X-RateLimit-Remaining", "")
+        reset = response.headers.get("X-RateLimit-Reset", "")
+        if remaining.isdigit() and reset.isdigit() and int(remaining) == 0:
+            self.resume_at = float(reset)
+
+    def post(self, message: str) -> bool:
+        """1通を送信（再試行は HTTP クライアントに任せる。POST なので接続前の失敗と 429 のときだけ）"""
+        url = f"{CHATWORK_API_BASE}/rooms/{CHATWORK_ROOM_ID}/messages"
+        headers = {"X-ChatWorkToken": CHATWORK_API_TOKEN}
+        metrics = get_metrics()
+        with metrics.timer("chatwork_post", {"chars": len(message)}):
+            with metrics.timer("chatwork_wait"):
+                self.wait_quota()
+            try:
+                response = get_http_client().post(url, headers=headers, data={"body": message})
+                self.track_quota(response)
+                response.raise_for_status()
+            except Exception as e:
+                print(f"[ERROR] Chatwork送信失敗: {e}")
+                metrics.inc("chatwork_messages", result="failed")
+                return False
+        metrics.inc("chatwork_messages", result="ok")
+        return True
+
+    def notify(self, new_salons: List[Salon], on_sent: Optional[Callable[[List[Salon]], None]] = None) -> int:
+        """新規店舗を通知（送信済みの店舗を除き、本文の上限ごとに分割して順に送信）
+
+        1通送れるたびに on_sent(その通に載せた店舗) を呼ぶ。送れた店舗数を返す。
+        """
+        unsent = []
+        seen = set()
+        for salon in new_salons:
+            if salon.id not in self.sent_ids and salon.id not in seen:
+                seen.add(salon.id)
+                unsent.append(salon)
+
+        messages = format_notifications(unsent)
+        sent = 0
+        for i, (salons, message) in enumerate(messages, 1):
+            print(f"\n[通知内容 {i}/{len(messages)}]")
+            print(message)
+            if not self.post(message):
+                print(f"[ERROR] Chatwork通知 {i}/{len(messages)}通目で中断（残り{len(unsent) - sent}件は次回再送）")
+                break
+            self.sent_ids.update(salon.id for salon in salons)
+            sent += len(salons)
+            if on_sent:
+                on_sent(salons)
+        if messages and sent == len(unsent):
+            print(f"[OK] Chatwork通知送信完了（{len(messages)}通）")
+        return sent
+
+
+_chatwork_dispatcher: Optional[ChatworkDispatcher] = None
+
+
+def get_chatwork_dispatcher() -> ChatworkDispatcher:
+    """共有 Chatwork 送信キューを取得"""
+    global _chatwork_dispatcher
+    with _http_client_lock:
+        if _chatwork_dispatcher is None:
+            _chatwork_dispatcher = ChatworkDispatcher()
+        return _chatwork_dispatcher
+
+
 def send_chatwork(message: str) -> bool:
     """Chatworkにメッセージを送信"""
-    url = f"https://api.chatwork.com/v2/rooms/{CHATWORK_ROOM_ID}/messages"
-    headers = {"X-ChatWorkToken": CHATWORK_API_TOKEN}
-    data = {"body": message}
-    
-    try:
-        response = requests.post(url, headers=headers, data=data, timeout=30)
-        response.raise_for_status()
+    if get_chatwork_dispatcher().post(message):
         print("[OK] Chatwork通知送信完了")
         return True
-    except Exception as e:
-        print(f"[ERROR] Chatwork送信失敗: {e}")
-        return False
+    return False
 
 
-def format_notification(new_salons: List[Dict]) -> str:
-    """通知メッセージを整形（電話番号付き）"""
+def format_notifications(new_salons: List[Salon], max_chars: int = CHATWORK_MAX_BODY_CHARS) -> List[Tuple[List[Salon], str]]:
+    """通知メッセージを整形（電話番号付き）。max_chars を超える分は複数通に分け、(載せた店舗, 本文) の一覧を返す"""
     now = datetime.now().strftime("%Y/%m/%d %H:%M")
     
-    lines = [
-        "[info][title]🆕 ホットペッパー NEW OPEN 美容室[/title]",
-        f"検出時刻: {now}",
-        f"新規店舗数: {len(new_salons)}件",
-        "",
-    ]
-    
     # エリア別にグループ化
-    by_area = {}
+    by_area: Dict[str, List[Salon]] = {}
     for salon in new_salons:
-        area = salon.get("area", "不明")
-        if area not in by_area:
-            by_area[area] = []
-        by_area[area].append(salon)
+        by_area.setdefault(salon.area or "不明", []).append(salon)
     
+    # 店舗ごとの行を上限まで詰める（見出し・末尾の分は先に確保しておく）
+    reserved = sum(len(line) + 1 for line in _notification_header(now, len(new_salons), 99, 99)) + len("[/info]")
+    chunks: List[Tuple[List[Salon], List[str]]] = []
+    salons_in_chunk: List[Salon] = []
+    lines: List[str] = []
+    size = reserved
+    area_in_chunk = None
     for area, salons in by_area.items():
-        lines.append(f"━━━ {area} ━━━")
-        for salon in salons[:15]:  # 各エリア最大15件
-            name = salon["name"][:40] if salon["name"] else "（店舗名取得中）"
-            phone = salon.get("phone", "")
-            phone_str = f"📞 {phone}" if phone else "📞 取得できず"
-            lines.append(f"【{name}】")
-            lines.append(phone_str)
-            lines.append(f"🔗 {salon['url']}")
-            lines.append("")
-        if len(salons) > 15:
-            lines.append(f"...他{len(salons) - 15}件")
-            lines.append("")
+        for salon in salons:
+            block = _salon_lines(salon)
+            if area != area_in_chunk:
+                block = [f"━━━ {area} ━━━"] + block
+            cost = sum(len(line) + 1 for line in block)
+            if salons_in_chunk and size + cost > max_chars:
+                chunks.append((salons_in_chunk, lines))
+                salons_in_chunk, lines, size = [], [], reserved
+                if area == area_in_chunk:
+                    block = [f"━━━ {area} ━━━"] + block
+                    cost = sum(len(line) + 1 for line in block)
+            salons_in_chunk.append(salon)
+            lines.extend(block)
+            size += cost
+            area_in_chunk = area
+    if salons_in_chunk:
+        chunks.append((salons_in_chunk, lines))
     
+    return [
+        (salons, "\n".join(_notification_header(now, len(new_salons), i, len(chunks)) + lines + ["[/info]"]))
+        for i, (salons, lines) in enumerate(chunks, 1)
+    ]
+
+
+def _notification_header(now: str, total: int, part: int, parts: int) -> List[str]:
+    title = "🆕 ホットペッパー NEW OPEN 美容室"
+    if parts > 1:
+        title += f"（{part}/{parts}）"
+    return [
+        f"[info][title]{title}[/title]",
+        f"検出時刻: {now}",
+        f"新規店舗数: {total}件",
+        "",
+    ]
+
+
+def _salon_lines(salon: Salon) -> List[str]:
+    name = salon.name[:40] if salon.name else "（店舗名取得中）"
+    phone_str = f"📞 {salon.phone}" if salon.phone else "📞 取得できず"
+    return [f"【{name}】", phone_str, f"🔗 {salon.url}", ""]
+
+
+# ============================================
+# 掲載の変化（追加・掲載終了・店舗名変更・再掲載）
+# ============================================
+
+LISTING_EVENT_LABELS = {"added": "追加", "removed": "掲載終了", "renamed": "店舗名変更", "relisted": "再掲載"}
+LISTING_NOTIFY_MAX_LINES = 100  # Chatwork に載せる変化の最大件数（残りは件数のみ）
+
+
+def summarize_listing_events(events: List[ListingEvent]) -> str:
+    """種類ごとの件数（ログ用）"""
+    counts = {kind: 0 for kind in LISTING_EVENT_LABELS}
+    for event in events:
+        counts[event.kind] += 1
+    return " / ".join(f"{label} {counts[kind]}件" for kind, label in LISTING_EVENT_LABELS.items())
+
+
+def emit_listing_events(events: List[ListingEvent]):
+    """掲載の変化を出力先へ（LISTING_EVENTS_FILE に追記・メトリクス・NOTIFY_LISTING_EVENTS の種類は Chatwork へ）"""
+    now = datetime.now().isoformat(timespec="seconds")
+    metrics = get_metrics()
+    for event in events:
+        metrics.inc("listing_events", kind=event.kind)
+    if LISTING_EVENTS_FILE:
+        append_jsonl(LISTING_EVENTS_FILE, ({"time": now, **asdict(event)} for event in events), LISTING_EVENTS_MAX_BYTES)
+    kinds = {kind.strip() for kind in NOTIFY_LISTING_EVENTS.split(",") if kind.strip()}
+    to_notify = [event for event in events if event.kind in kinds]
+    if to_notify:
+        send_chatwork(format_listing_events(to_notify))
+
+
+def format_listing_events(events: List[ListingEvent]) -> str:
+    """掲載の変化の通知メッセージ（種類ごとに並べ、LISTING_NOTIFY_MAX_LINES を超える分は件数のみ）"""
+    now = datetime.now().strftime("%Y/%m/%d %H:%M")
+    lines = ["[info][title]🔄 ホットペッパー 掲載の変化[/title]", f"検出時刻: {now}", summarize_listing_events(events), ""]
+    shown = 0
+    for kind, label in LISTING_EVENT_LABELS.items():
+        of_kind = [event for event in events if event.kind == kind][:LISTING_NOTIFY_MAX_LINES - shown]
+        if not of_kind:
+            continue
+        lines.append(f"━━━ {label} ━━━")
+        for event in of_kind:
+            area = AREAS.get(event.key.split("_", 1)[-1], event.key)
+            name = event.name[:40] or event.salon_id
+            if event.old_name:
+                name = f"{event.old_name[:40]} → {name}"
+            lines.append(f"【{name}】（{area}） {BASE_URL}/{event.salon_id}/")
+            shown += 1
+    if shown < len(events):
+        lines.append(f"ほか {len(events) - shown}件")
     lines.append("[/info]")
-    
     return "\n".join(lines)
 
 
+# ============================================
+# パイプライン（スキャン → 差分 → 電話番号 → スプシ / Chatwork）
+# ============================================
+
+_END = object()  # ステージ間のキューの終端
+
+
+class StageTimings:
+    """パイプラインの段階ごとの所要時間・件数と、店舗を見つけてから通知するまでの時間（スレッドセーフ）"""
+
+    ORDER = ["scan", "diff", "phone", "sheet", "chatwork"]
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.seconds: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.found_at: Dict[int, float] = {}
+        self.alert_latencies: List[float] = []
+        self.first_alert: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, count: int = 1):
+        with self.lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + count
+
+    def found(self, salon: Salon):
+        with self.lock:
+            self.found_at[salon.number] = time.monotonic()
+
+    def alerted(self, salons: List[Salon]):
+        now = time.monotonic()
+        with self.lock:
+            if self.first_alert is None:
+                self.first_alert = now - self.started
+            self.alert_latencies.extend(now - self.found_at[s.number] for s in salons if s.number in self.found_at)
+
+    def stages(self) -> List[str]:
+        return sorted(self.seconds, key=lambda stage: self.ORDER.index(stage) if stage in self.ORDER else len(self.ORDER))
+
+    def summary(self) -> str:
+        with self.lock:
+            parts = [f"{stage} {self.seconds[stage]:.2f}秒/{self.counts[stage]}件" for stage in self.stages()]
+            if self.first_alert is not None:
+                parts.append(f"最初の通知まで {self.first_alert:.2f}秒")
+            if self.alert_latencies:
+                parts.append(f"検出→通知 平均 {sum(self.alert_latencies) / len(self.alert_latencies):.2f}秒 / "
+                             f"最大 {max(self.alert_latencies):.2f}秒")
+        return " / ".join(parts)
+
+    def to_dict(self) -> Dict:
+        """実行レポート用（段階ごとの秒数・件数、最初の通知までと検出→通知の秒数）"""
+        with self.lock:
+            latencies = self.alert_latencies
+            return {
+                "stages": {stage: {"sec": round(self.seconds[stage], 3), "count": self.counts[stage]} for stage in self.stages()},
+                "first_alert_sec": None if self.first_alert is None else round(self.first_alert, 3),
+                "alert_latency_sec_mean": round(sum(latencies) / len(latencies), 3) if latencies else None,
+                "alert_latency_sec_max": round(max(latencies), 3) if latencies else None,
+            }
+
+
+def iter_new_salons(found: Iterable[Tuple[str, Salon]], known: KnownSalons, current: Dict[str, List[Salon]],
+                    skip_ids: Container[int], timings: StageTimings) -> Iterator[Tuple[str, Salon]]:
+    """差分: 既知でない店舗だけを返す（今回の結果内の重複は1件に。スキャン結果はすべて current に貯める）"""
+    seen = set()
+    for key, salon in found:
+        started = time.monotonic()
+        current.setdefault(key, []).append(salon)
+        number = salon.number
+        is_new = number not in seen and number not in skip_ids and number not in known
+        seen.add(number)
+        timings.add("diff", time.monotonic() - started)
+        if is_new:
+            timings.found(salon)
+            yield key, salon
+    timings.add("scan", time.monotonic() - timings.started, len(seen))
+
+
+def iter_enriched(new: Iterable[Tuple[str, Salon]], timings: StageTimings,
+                  stop: Optional[threading.Event] = None) -> Iterator[Tuple[str, Salon]]:
+    """電話番号: 上流を別スレッドで読みながら並列に取得し、取得できた順に返す（記録済みの電話番号はそのまま）
+
+    受け取る側が途中で抜けたら（例外・close()）stop をセットし、上流の読み込みをやめて
+    まだ始まっていない取得を取り消す（上流の iter_scan にも同じ stop を渡しておけばスキャンも止まる）。
+    """
+    done: queue.Queue = queue.Queue()
+    stop = threading.Event() if stop is None else stop
+
+    def lookup(key: str, salon: Salon) -> Tuple[str, Salon]:
+        started = time.monotonic()
+        salon.phone = lookup_phone(salon)
+        timings.add("phone", time.monotonic() - started)
+        return key, salon
+
+    def feed():
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, PHONE_CONCURRENCY)) as executor:
+                for key, salon in new:
+                    if stop.is_set():
+                        executor.shutdown(cancel_futures=True)
+                        break
+                    if salon.phone is not None:
+                        done.put((key, salon))
+                    else:
+                        executor.submit(lookup, key, salon).add_done_callback(done.put)
+        except BaseException as e:
+            done.put(e)
+        done.put(_END)
+
+    threading.Thread(target=feed, name="phone-feed", daemon=True).start()
+    try:
+        while True:
+            item = done.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item.result() if isinstance(item, Future) else item
+    finally:
+        stop.set()
+
+
+def iter_batches(items: queue.Queue, size: int, seconds: float,
+                 first_seconds: Optional[float] = None) -> Iterator[List]:
+    """キューから最大 size 件ずつ返す（各バッチの最初の1件から seconds 秒たったら件数が少なくても返す。_END で終了）
+
+    first_seconds を指定すると、最初のバッチだけはその秒数で返す（最初の1件は早く、後続はまとめて）。
+    """
+    wait = seconds if first_seconds is None else first_seconds
+    while True:
+        item = items.get()
+        if item is _END:
+            return
+        batch = [item]
+        deadline = time.monotonic() + wait
+        wait = seconds
+        while len(batch) < size:
+            try:
+                item = items.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _END:
+                yield batch
+                return
+            batch.append(item)
+        yield batch
+
+
+class Sink:
+    """パイプラインの出力先（専用スレッドで受け取り、iter_batches でまとめて handle に渡す）"""
+
+    def __init__(self, name: str, handle: Callable[[List[Salon]], None], batch_size: int, batch_seconds: float,
+                 timings: StageTimings, first_batch_seconds: Optional[float] = None):
+        self.name = name
+        self.handle = handle
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.first_batch_seconds = first_batch_seconds
+        self.timings = timings
+        self.queue: queue.Queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name=f"sink-{name}", daemon=True)
+        self.thread.start()
+
+    def put(self, salon: Salon):
+        self.queue.put(salon)
+
+    def close(self):
+        """残りを出力し終えるまで待つ"""
+        self.queue.put(_END)
+        self.thread.join()
+
+    def run(self):
+        for batch in iter_batches(self.queue, self.batch_size, self.batch_seconds, self.first_batch_seconds):
+            started = time.monotonic()
+            try:
+                self.handle(batch)
+            except Exception as e:
+                print(f"[ERROR] {self.name} への出力失敗: {e}")
+            self.timings.add(self.name, time.monotonic() - started, len(batch))
+
+
+# ============================================
+# プロファイル（python main.py --profile）
+# ============================================
+
+THREAD_NUMBER_PATTERN = re.compile(r"[-_]\d+(?:_\d+)?$")  # ThreadPoolExecutor-0_3 → ThreadPoolExecutor
+
+
+class Profiler:
+    """1回分の実行を cProfile・tracemalloc・スタックサンプリングで計測
+
+    cProfile は Python 3.11 以前ならスレッドごとに Profile を有効にして最後にまとめる（スキャン・電話番号・
+    出力先のスレッドも含む）。3.12 以降は sys.monitoring の都合で同時に1つしか有効にできないので
+    メインスレッドだけを計測し、ワーカースレッドはスタックサンプリングで見る。
+    スタックは PROFILE_SAMPLE_INTERVAL ごとに全スレッドを覗いて数える（待ち時間も含む実時間。flamegraph 用）。
+    区間（load_state / pipeline / save_state）ごとに時間・メモリのピーク・増えた確保箇所を記録する。
+    """
+
+    per_thread = sys.version_info < (3, 12)
+
+    def __init__(self):
+        import cProfile
+        self.profile_class = cProfile.Profile
+        self.profiles = []
+        self.lock = threading.Lock()
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.phases: List[Dict] = []
+        self.peak = 0
+        self.snapshot = None
+        self.started = 0.0
+        self.elapsed = 0.0
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self.sample, name="profiler", daemon=True)
+
+    def profile_thread(self, *args):
+        """新しいスレッドの最初のイベントで、そのスレッド用の Profile を有効にする（threading.setprofile 用）"""
+        profile = self.profile_class()
+        with self.lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def start(self):
+        import tracemalloc
+        tracemalloc.start(PROFILE_TRACE_FRAMES)
+        self.snapshot = self.take_snapshot()
+        self.sampler.start()
+        if self.per_thread:
+            threading.setprofile(self.profile_thread)
+        self.started = time.perf_counter()
+        self.profile_thread()
+
+    def stop(self):
+        import tracemalloc
+        self.profiles[0].disable()
+        self.elapsed = time.perf_counter() - self.started
+        if self.per_thread:
+            threading.setprofile(None)
+        self.stopped.set()
+        self.sampler.join()
+        self.peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    def sample(self):
+        """全スレッドのスタックを数える（collapsed stack 形式のキー: スレッド名;呼び出し元;...;実行中の関数）"""
+        own = threading.get_ident()
+        while not self.stopped.wait(PROFILE_SAMPLE_INTERVAL):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(THREAD_NUMBER_PATTERN.sub("", names.get(ident, "thread")))
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    @staticmethod
+    def take_snapshot():
+        import tracemalloc
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ])
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        import tracemalloc
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            current, peak = tracemalloc.get_traced_memory()
+            self.profiles[0].disable()  # スナップショットの集計自体はプロファイルに含めない
+            snapshot = self.take_snapshot()
+            grown = [stat for stat in snapshot.compare_to(self.snapshot, "lineno") if stat.size_diff > 0]
+            self.snapshot = snapshot
+            self.phases.append({
+                "name": name, "sec": elapsed,
+                "start_mb": before / 2 ** 20, "end_mb": current / 2 ** 20, "peak_mb": peak / 2 ** 20,
+                "grown": grown[:10],
+            })
+            self.profiles[0].enable()
+
+    def write(self, directory: str) -> List[str]:
+        """profile.txt（レポート）・profile.pstats・profile.collapsed を書き出してパスを返す"""
+        import pstats
+        os.makedirs(directory, exist_ok=True)
+        paths = [os.path.join(directory, name) for name in ("profile.txt", "profile.pstats", "profile.collapsed")]
+        stats = pstats.Stats(*self.profiles)
+        stats.dump_stats(paths[1])
+        stats.strip_dirs()
+        scope = "全スレッド合計" if self.per_thread else "メインスレッドのみ。ワーカーは profile.collapsed を参照"
+        with open(paths[0], "w", encoding="utf-8") as f:
+            f.write(f"実行時間: {self.elapsed:.2f}秒 / スレッド: {len(self.profiles) if self.per_thread else 'メインのみ'} / "
+                    f"メモリのピーク（tracemalloc）: {self.peak / 2 ** 20:.1f}MB\n")
+            f.write("\n=== 区間ごとの時間・メモリ ===\n")
+            for phase in self.phases:
+                f.write(f"[{phase['name']}] {phase['sec']:.2f}秒 / {phase['start_mb']:.1f}MB → {phase['end_mb']:.1f}MB"
+                        f"（ピーク {phase['peak_mb']:.1f}MB）\n")
+                for stat in phase["grown"]:
+                    f.write(f"    +{stat.size_diff / 1024:.1f}KiB +{stat.count_diff}個  {stat.traceback}\n")
+            stats.stream = f
+            f.write(f"\n=== 関数（自身の時間順。{scope}）===\n")
+            stats.sort_stats("tottime").print_stats(PROFILE_TOP)
+            f.write(f"\n=== 関数（累積時間順。{scope}）===\n")
+            stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+            f.write("\n=== main.py の関数（累積時間順）===\n")
+            stats.sort_stats("cumulative").print_stats(r"main\.py", PROFILE_TOP)
+        with open(paths[2], "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        return paths
+
+    def summary(self, limit: int = 10) -> List[str]:
+        """標準出力用（区間と、自身の時間が長い main.py の関数）"""
+        import pstats
+        lines = [f"[{phase['name']}] {phase['sec']:.2f}秒 / ピーク {phase['peak_mb']:.1f}MB" for phase in self.phases]
+        stats = pstats.Stats(*self.profiles).strip_dirs().sort_stats("tottime")
+        own = [func for func in stats.fcn_list if func[0] == os.path.basename(__file__)]
+        for func in own[:limit]:
+            filename, line, name = func
+            cc, nc, tottime, cumtime, callers = stats.stats[func]
+            lines.append(f"  {name}（{filename}:{line}） 自身 {tottime:.3f}秒 / 累積 {cumtime:.3f}秒 / {nc}回")
+        return lines
+
+
+_profiler: Optional[Profiler] = None
+
+
+def profile_phase(name: str):
+    """プロファイル中なら区間の時間・メモリを記録（通常は何もしない）"""
+    return contextlib.nullcontext() if _profiler is None else _profiler.phase(name)
+
+
+def run_profile():
+    """プロファイルモード: main() を1回、cProfile・tracemalloc・スタックサンプリング付きで実行して PROFILE_DIR に書き出す"""
+    global _profiler
+    profiler = Profiler()
+    _profiler = profiler
+    profiler.start()
+    try:
+        main()
+    finally:
+        profiler.stop()
+        _profiler = None
+        paths = profiler.write(PROFILE_DIR)
+        print("\n[PROFILE] " + "\n[PROFILE] ".join(profiler.summary()))
+        print(f"[PROFILE] レポート: {paths[0]} / pstats: {paths[1]} / collapsed stack: {paths[2]}")
+
+
 # ============================================
 # メイン処理
 # ============================================
@@ -462,55 +2758,216 @@ def main():
     print("=" * 60)
     
     # 既知の店舗を読み込み
-    known_salons = load_known_salons()
+    with profile_phase("load_state"):
+        known_salons = load_known_salons()
+        scan_state = load_scan_state()
+    run_cycle(known_salons, scan_state)
+    if isinstance(known_salons, SalonStore):
+        known_salons.close()
+    
+    print("\n[DONE] 完了")
+
+
+def run_cycle(known_salons: KnownSalons, scan_state: Dict) -> List[Salon]:
+    """1サイクル分の監視（スキャン → 差分 → 電話番号 → スプシ / Chatwork を流れ作業で → 状態保存）
+
+    ページを取得するたびに新規店舗を判定し、電話番号が取れた店舗から順に出力先へ送る。
+    出力先はそれぞれ件数か時間でまとめて書き込む（通知は1通目だけ数秒で送り、以降とスプシは長めにまとめる）。
+    """
     is_first_run = len(known_salons) == 0
+    for cache in (_page_cache, _phone_cache):
+        if cache is not None:
+            cache.stats.update(dict.fromkeys(cache.stats, 0))  # 統計はサイクルごとに数え直す
+    metrics = get_metrics()
+    metrics.reset()
     
     if is_first_run:
         print("[INFO] 初回実行 - 現在の店舗リストを取得します")
     
-    # 全ページをスキャン
-    current_salons = scan_all_categories()
+    # スキャン対象（通常は差分、一定間隔で全件）
+    scheduler = PollScheduler(scan_state)
+    full_sweep = is_first_run or is_full_sweep_due(scan_state)
+    # 初回は全店舗を取得しないと既知リストを作れないので、予算によらず全件スキャン
+    if full_sweep and not is_first_run and SCAN_SCHEDULER == "adaptive" and not scheduler.can_sweep():
+        print(f"[SCHED] 全件スキャンは予算の残りが足りないので見送り（直近1時間 {scheduler.spent(time.time())}"
+              f"/{POLL_BUDGET_PER_HOUR}リクエスト、前回の全件スキャン {scan_state['sweep_requests']}リクエスト）")
+        full_sweep = False
+    print(f"[INFO] {'全件' if full_sweep else '差分'}スキャン")
+    keys = None
+    if not full_sweep and SCAN_SCHEDULER == "adaptive":
+        keys = scheduler.select(get_area_keys())
+        print(f"[SCHED] 対象 {len(keys)}/{len(get_area_keys())}エリア: {', '.join(keys) or 'なし'}")
+    requests_before = get_http_client().sent(BASE_URL)
     
-    # 新規店舗を検出
-    new_salons = find_new_salons(current_salons, known_salons)
-    
-    print("-" * 60)
-    print(f"新規店舗: {len(new_salons)}件")
+    # 前回途中で止まっていれば、その分（電話番号は記録済み）を先に流す
+    journal = RunJournal(JOURNAL_FILE)
+    try:
+        resumed = journal.resumable()
+        if len(journal):
+            print(f"[INFO] 前回の続きから再開: 検出済み {len(journal)}件 / "
+                  f"スプシ追加済み {len(journal.done['sheet'])}件 / 通知済み {len(journal.done['notify'])}件")
     
-    # 新規店舗の電話番号を取得してスプシに追加
-    if new_salons:
-        print("\n[電話番号取得中...]")
-        for i, salon in enumerate(new_salons):
-            print(f"  {i+1}/{len(new_salons)}: {salon['name'][:30]}...", end=" ")
-            phone = get_phone_number(salon["tel_url"])
-            salon["phone"] = phone
-            print(f"→ {phone if phone else 'なし'}")
-            time.sleep(REQUEST_DELAY)
-
-        # スプレッドシートに追加（初回も含む）
-        print("\n[スプレッドシート更新中...]")
-        append_salons_to_sheet(new_salons)
-
-        # Chatwork通知（初回は送信しない）
+        # 出力先（スプシは初回も含む。Chatwork 通知は初回は送らない）
+        timings = StageTimings()
+
+        def to_sheet(salons: List[Salon]):
+            salons = journal.pending("sheet", salons)
+            if salons and append_salons_to_sheet(salons):
+                journal.mark("sheet", salons)
+
+        def on_notified(salons: List[Salon]):
+            journal.mark("notify", salons)
+            timings.alerted(salons)
+
+        def to_chatwork(salons: List[Salon]):
+            get_chatwork_dispatcher().notify(journal.pending("notify", salons), on_sent=on_notified)
+
+        sinks = [Sink("sheet", to_sheet, SHEET_BATCH_SIZE, SHEET_BATCH_SECONDS, timings)]
         if not is_first_run:
-            message = format_notification(new_salons)
-            print("\n[通知内容]")
-            print(message)
-            send_chatwork(message)
+            sinks.append(Sink("chatwork", to_chatwork, NOTIFY_BATCH_SIZE, NOTIFY_BATCH_SECONDS, timings,
+                              NOTIFY_FIRST_BATCH_SECONDS))
+    
+        # スキャン → 差分 → 電話番号 → 出力先
+        scan_stats: Dict[str, Dict] = {}
+        current_salons: Dict[str, List[Salon]] = {}
+        new_salons: List[Salon] = []
+        new_by_key: Dict[str, int] = {}
+        journaled = {salon.number for salon in journal.salons.values()}
+        with profile_phase("pipeline"):
+            stop = threading.Event()
+            found = iter_scan(None if full_sweep else known_salons, keys, scan_stats, stop)
+            new = chain(resumed, iter_new_salons(found, known_salons, current_salons, journaled, timings))
+            enriched = iter_enriched(new, timings, stop)
+            try:
+                for key, salon in enriched:
+                    if salon.number not in journaled:
+                        journal.record(salon, key)
+                        # 前回から持ち越した店舗は前回のスキャンで検出済みなので、到着率には数えない
+                        new_by_key[key] = new_by_key.get(key, 0) + 1
+                    new_salons.append(salon)
+                    print(f"  [NEW] {salon.name[:30]}... → {salon.phone or '電話番号なし'}")
+                    for sink in sinks:
+                        sink.put(salon)
+            finally:
+                enriched.close()  # 途中で失敗したらスキャン・電話番号取得のスレッドも止める（次のサイクルまで走らせない）
+                for sink in sinks:
+                    sink.close()
+        journal.sync()
+    
+        print("-" * 60)
+        print(f"新規店舗: {len(new_salons)}件")
+        if new_salons:
+            phone_stats = get_phone_cache().stats
+            print(f"[CACHE] 電話番号 キャッシュ: {phone_stats['hit']} / 取得できず（再確認待ち）: {phone_stats['negative']} / 取得: {phone_stats['miss']}")
         else:
-            # 初回実行完了通知
+            print("[INFO] 新規店舗なし")
+    
+        # 初回実行完了通知
+        to_notify = journal.pending("notify", new_salons)
+        if is_first_run and to_notify:
             total = sum(len(s) for s in current_salons.values())
             msg = f"[info][title]✅ 監視システム起動完了[/title]現在の掲載店舗数: {total}件\nスプレッドシートに全店舗を追加しました。\n次回以降、新規店舗を検出したら通知します。[/info]"
-            send_chatwork(msg)
-    else:
-        print("[INFO] 新規店舗なし")
+            if send_chatwork(msg):
+                journal.mark("notify", to_notify)
+        print(f"[PIPELINE] {timings.summary()}")
     
-    # 既知リストを更新・保存
-    known_salons = update_known_salons(current_salons, known_salons)
-    save_known_salons(known_salons)
+        for key, stats in scan_stats.items():
+            scheduler.record_scan(key, None if is_first_run else new_by_key.get(key, 0), stats.get("pages", 0))
+        requests_sent = get_http_client().sent(BASE_URL) - requests_before
+        scheduler.record_requests(requests_sent)
+        if full_sweep:
+            scheduler.record_sweep(requests_sent)
     
-    print("\n[DONE] 完了")
+        # 既知リストを更新・保存（各ファイルはアトミックに置き換え、最後に進捗ログを送れなかった分だけにする）
+        with metrics.timer("save_state"), profile_phase("save_state"):
+            journal.fold_into(current_salons)
+            # json はエリアごとのID一覧しか保存できず、掲載終了・期限切れの店舗が次回は新規扱いになるので追跡しない
+            tracking = STATE_BACKEND != "json"
+            complete_keys = complete_scan_keys(scan_stats, current_salons) if tracking else set()
+            events = update_known_salons(current_salons, known_salons, complete_keys)
+            expired = expire_known_salons(known_salons) if tracking else 0
+            save_known_salons(known_salons)
+            if full_sweep:
+                scan_state["last_full_sweep"] = datetime.now().isoformat(timespec="seconds")
+            save_scan_state(scan_state)
+            get_page_cache().save()
+            # 電話番号キャッシュ・スプシのミラーは、この回（プロセス）で使ったときだけ保存
+            if _phone_cache is not None:
+                _phone_cache.save()
+            if _sheets_sink is not None:
+                _sheets_sink.save_index()
+            unfinished = journal.close()
+    finally:
+        journal.release()  # 途中で失敗しても（常駐モードの次のサイクルへ）ファイルハンドルを残さない
+    if unfinished:
+        print(f"[WARN] スプシ追加・通知が済んでいない {unfinished}件は既知にせず、次回送り直します")
+
+    # 掲載の変化（初回は全店舗が「追加」になるので出さない）
+    print(f"[DIFF] {summarize_listing_events(events)} / 期限切れ削除 {expired}件"
+          f"（掲載終了の判定: {len(complete_keys)}エリア）")
+    if events and not is_first_run:
+        emit_listing_events(events)
+
+    # 実行レポート（METRICS_FILE に1行追記）
+    metrics.write(
+        first_run=is_first_run,
+        full_sweep=full_sweep,
+        areas=len(get_area_keys()) if keys is None else len(keys),
+        salons_seen=sum(len(s) for s in current_salons.values()),
+        new_salons=len(new_salons),
+        expired_salons=expired,
+        list_pages=dict(get_page_cache().stats),
+        phone_cache=None if _phone_cache is None else dict(_phone_cache.stats),
+        pipeline=timings.to_dict(),
+    )
+    return new_salons
+
+
+def run_daemon():
+    """常駐モード: 状態・HTTP接続・Sheetsクライアントをメモリに持ったまま一定間隔で監視
+
+    SIGTERM / SIGINT を受けたら実行中のサイクルを終えて状態を保存してから終了する。
+    """
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"\n[INFO] シグナル {signum} を受信 - 現在のサイクル終了後に停止します")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    print("=" * 60)
+    print("ホットペッパービューティー NEW OPEN 美容室監視（常駐モード）")
+    print(f"間隔: {DAEMON_INTERVAL_SEC:.0f}秒 + 揺らぎ 0〜{DAEMON_JITTER_SEC:.0f}秒")
+    print("=" * 60)
+
+    known_salons = load_known_salons()
+    scan_state = load_scan_state()
+    cycle = 0
+    try:
+        while not stop.is_set():
+            cycle += 1
+            started = time.monotonic()
+            print(f"\n[CYCLE {cycle}] {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            try:
+                run_cycle(known_salons, scan_state)
+            except Exception as e:
+                # 1サイクルの失敗で常駐を止めない（進捗ログがあるので次のサイクルで再開される）
+                print(f"[ERROR] サイクル {cycle} 失敗: {e}")
+            # 開始時刻基準で次回を決める（処理が間隔より長引いたらすぐ次へ）
+            delay = DAEMON_INTERVAL_SEC + random.uniform(0, DAEMON_JITTER_SEC) - (time.monotonic() - started)
+            stop.wait(max(0.0, delay))
+    finally:
+        if isinstance(known_salons, SalonStore):
+            known_salons.close()
+    print("\n[DONE] 停止しました")
 
 
 if __name__ == "__main__":
-    main()
+    if "--daemon" in sys.argv[1:]:
+        run_daemon()
+    elif "--profile" in sys.argv[1:]:
+        run_profile()
+    else:
+        main()
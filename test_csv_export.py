@@ -5,21 +5,19 @@
 - 結果をCSVファイルに出力
 """
 
-import requests
 from bs4 import BeautifulSoup
 import csv
-import time
 import re
 from datetime import datetime
 from typing import Dict, List
 
+from main import fetch_page  # 共有HTTPクライアント（プール・リトライ・レート制限）
+
 # ============================================
 # 設定
 # ============================================
 
-REQUEST_DELAY = 1.5  # リクエスト間隔（秒）
 MAX_PAGES = 50  # 1カテゴリあたり最大ページ数
-USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
 # 監視対象エリア
 AREAS = {
@@ -54,17 +52,6 @@ def get_new_open_url(genre_prefix: str, area_code: str, page: int = 1) -> str:
         return f"{base}/{genre_prefix}{area_code}/{NEW_OPEN_PATH}PN{page}.html"
 
 
-def fetch_page(url: str) -> str | None:
-    headers = {"User-Agent": USER_AGENT}
-    try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return response.text
-    except Exception as e:
-        print(f"[ERROR] {url}: {e}")
-        return None
-
-
 def extract_salons(html: str) -> List[Dict]:
     """HTMLから店舗情報を抽出"""
     soup = BeautifulSoup(html, "html.parser")
@@ -173,7 +160,6 @@ def scan_category(genre_key: str, genre_info: dict, area_code: str, area_name: s
             break
             
         page += 1
-        time.sleep(REQUEST_DELAY)
     
     print(f"  → 合計: {len(all_salons)}件")
     return all_salons
@@ -191,7 +177,6 @@ def main():
         for area_code, area_name in AREAS.items():
             salons = scan_category(genre_key, genre_info, area_code, area_name)
             all_salons.extend(salons)
-            time.sleep(REQUEST_DELAY)
     
     # CSV出力
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
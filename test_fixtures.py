@@ -0,0 +1,45 @@
+"""一覧・電話番号ページのパーサをコミット済みフィクスチャと期待値（fixtures/expected.json）で検証"""
+
+import os
+
+import pytest
+
+import bench
+import main
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), bench.FIXTURE_DIR)
+
+
+def test_fixtures_and_golden_file_are_committed():
+    assert os.path.exists(os.path.join(FIXTURE_DIR, bench.GOLDEN_FILE))
+    assert bench.load_list_pages(FIXTURE_DIR)
+    assert bench.load_tel_pages(FIXTURE_DIR)
+
+
+@pytest.mark.parametrize("pages", [
+    pytest.param(lambda: bench.load_list_pages(FIXTURE_DIR), id="fixtures"),
+    pytest.param(bench.synthetic_list_pages, id="synthetic"),
+])
+def test_all_backends_match_bs4(pages):
+    assert bench.verify_backends(pages()) == []
+
+
+def test_all_backends_match_golden_file():
+    assert bench.verify_golden(FIXTURE_DIR) == []
+
+
+def test_phone_extraction_matches_legacy_parser():
+    assert bench.verify_phone(bench.load_tel_pages(FIXTURE_DIR)) == []
+
+
+def test_golden_file_detects_parser_drift(monkeypatch):
+    # 期待値と食い違えば検出できること（比較が空振りしていないこと）
+    original = main.PARSER_BACKENDS["bs4"]
+
+    def drifted(html, page):
+        analysis = original(html, page)
+        analysis.total_pages += 1
+        return analysis
+
+    monkeypatch.setitem(main.PARSER_BACKENDS, "bs4", drifted)
+    assert any(error.startswith("golden: bs4:") for error in bench.verify_golden(FIXTURE_DIR))
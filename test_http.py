@@ -0,0 +1,190 @@
+"""HttpClient の再試行（POST は届いたかもしれないものを送り直さない）のテスト"""
+
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import main
+
+
+class Server:
+    """応答（ステータス・ヘッダー・遅延）を順に返し、受けたリクエストを数えるHTTPサーバ"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.received = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def handle_one(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                server.received.append(self.command)
+                status, headers, delay = server.replies.pop(0) if server.replies else (200, {}, 0)
+                time.sleep(delay)
+                self.send_response(status)
+                self.send_header("Content-Length", "2")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            do_GET = do_POST = handle_one
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "REQUEST_RATE", 1000.0)
+    monkeypatch.setattr(main, "RETRY_BACKOFF", 0.01)
+    monkeypatch.setattr(main, "_metrics", None)
+    return main.HttpClient()
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(*replies):
+        servers.append(Server(replies))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def test_get_is_retried_on_5xx(client, serve):
+    server = serve((503, {}, 0), (200, {}, 0))
+    assert client.get(server.url).status_code == 200
+    assert server.received == ["GET", "GET"]
+
+
+def test_post_is_not_retried_on_5xx(client, serve):
+    server = serve((503, {}, 0), (200, {}, 0))
+    assert client.post(server.url, data={"body": "x"}).status_code == 503
+    assert server.received == ["POST"]
+
+
+def test_post_is_not_retried_after_read_timeout(client, serve):
+    server = serve((200, {}, 0.5))
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.post(server.url, data={"body": "x"}, timeout=0.1)
+    time.sleep(0.5)
+    assert server.received == ["POST"]
+
+
+def test_post_is_retried_on_429_after_retry_after(client, serve, monkeypatch):
+    monkeypatch.setattr(main, "RETRY_BACKOFF", 10.0)  # Retry-After があればバックオフは足さない
+    server = serve((429, {"Retry-After": "1"}, 0), (200, {}, 0))
+    started = time.monotonic()
+    assert client.post(server.url, data={"body": "x"}).status_code == 200
+    assert 1 <= time.monotonic() - started < 3
+    assert server.received == ["POST", "POST"]
+
+
+def test_retry_after_is_capped(client, serve, monkeypatch):
+    monkeypatch.setattr(main, "RATE_LIMIT_MAX_WAIT", 0.2)
+    server = serve((503, {"Retry-After": "3600"}, 0), (200, {}, 0))
+    started = time.monotonic()
+    assert client.get(server.url).status_code == 200
+    assert time.monotonic() - started < 2
+    assert server.received == ["GET", "GET"]
+
+
+def test_post_is_retried_when_connection_is_refused(client):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]  # 閉じたポート（接続は拒否される）
+    calls = []
+    original = client.session.request
+
+    def request(*args, **kwargs):
+        calls.append(args[0])
+        return original(*args, **kwargs)
+
+    client.session.request = request
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.post(f"http://127.0.0.1:{port}/", data={"body": "x"})
+    assert len(calls) == main.MAX_RETRIES + 1
+
+
+def test_chatwork_message_is_posted_once_on_5xx(serve, monkeypatch):
+    server = serve((502, {}, 0), (200, {}, 0))
+    monkeypatch.setattr(main, "CHATWORK_API_BASE", server.url.rstrip("/"))
+    monkeypatch.setattr(main, "REQUEST_RATE", 1000.0)
+    monkeypatch.setattr(main, "RETRY_BACKOFF", 0.01)
+    monkeypatch.setattr(main, "_http_client", None)
+    assert main.ChatworkDispatcher().post("hello") is False
+    assert server.received == ["POST"]
+
+
+@pytest.fixture
+def phone_server(client, serve, tmp_path, monkeypatch):
+    """電話番号ページを返すサーバに向けた lookup_phone（キャッシュは tmp_path）"""
+
+    def start(*replies):
+        server = serve(*replies)
+        monkeypatch.setattr(main, "BASE_URL", server.url.rstrip("/"))
+        monkeypatch.setattr(main, "_http_client", client)
+        monkeypatch.setattr(main, "_phone_cache", main.PhoneCache(str(tmp_path / "phone_cache.json")))
+        return server
+
+    return start
+
+
+def test_phone_page_5xx_is_retried_only_by_http_client(phone_server):
+    server = phone_server(*[(503, {}, 0)] * 10)
+    salon = main.Salon(123, "サロン")
+    assert main.lookup_phone(salon) == ""
+    assert len(server.received) == main.MAX_RETRIES + 1
+    # 取得できなかった店舗は再確認まで取りに行かない
+    assert main.lookup_phone(salon) == ""
+    assert len(server.received) == main.MAX_RETRIES + 1
+
+
+def test_phone_page_404_is_not_retried(phone_server):
+    server = phone_server((404, {}, 0))
+    assert main.lookup_phone(main.Salon(123, "サロン")) == ""
+    assert server.received == ["GET"]
+    assert main.get_phone_cache().get("slnH000000123") == ""
+
+
+def test_request_rate_applies_only_to_hotpepper(client):
+    assert client.bucket(f"{main.BASE_URL}/slnH000000001/tel/").rate == main.REQUEST_RATE
+    # Chatwork の API は REQUEST_RATE（取得先への配慮）では待たせない（投稿ペースは ChatworkDispatcher が決める）
+    chatwork = client.bucket(f"{main.CHATWORK_API_BASE}/rooms/1/messages")
+    assert chatwork.rate is None
+    for _ in range(100):
+        chatwork.acquire()
+    assert client.sent(main.CHATWORK_API_BASE) == 100
+
+
+def test_chatwork_pace_fits_room_limit(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(main.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(main.time, "sleep", lambda seconds: clock.__setitem__(0, clock[0] + seconds))
+    bucket = main.ChatworkDispatcher().bucket
+    posted = []
+    for _ in range(60):
+        bucket.acquire()
+        posted.append(clock[0])
+    # どの10秒間でも10通まで（同一ルームへの投稿の上限）
+    assert max(sum(start <= t < start + 10 for t in posted) for start in posted) <= 10
@@ -0,0 +1,160 @@
+"""送れなかったスプシ追加・通知が進捗ログに残り、次の実行で送り直されることのテスト"""
+
+import os
+import threading
+import time
+
+import gspread
+import pytest
+import requests
+
+import bench
+import main
+
+
+def restart(server):
+    """1回実行のプロセスを起動し直したのと同じ状態にする（スプシのバッファ・送信済みの記憶も捨てる）"""
+    main._http_client = main._page_cache = main._phone_cache = main._chatwork_dispatcher = None
+    main._sheets_sink = main.SheetsSink()
+    main._sheets_sink.worksheet = bench.StandInWorksheet(server)
+
+
+def fail_append(self, rows):
+    response = requests.Response()
+    response.status_code = 503
+    raise gspread.exceptions.APIError(response)
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """スタンドインサーバに向けた main（スプシは SheetsSink から StandInWorksheet へ書く）"""
+    monkeypatch.chdir(tmp_path)
+    with bench.StandInServer(1, 5, 0.0, 0.0) as server:
+        monkeypatch.setattr(main, "BASE_URL", server.url)
+        monkeypatch.setattr(main, "CHATWORK_API_BASE", f"{server.url}/v2")
+        monkeypatch.setattr(main, "REQUEST_RATE", 1000.0)
+        monkeypatch.setattr(main, "RETRY_BACKOFF", 0.01)
+        monkeypatch.setattr(main, "SCAN_SCHEDULER", "all")
+        monkeypatch.setattr(main, "METRICS_FILE", "")
+        monkeypatch.setattr(main, "SHEET_RETRY_BACKOFF", 0.01)
+        for name in ("_http_client", "_page_cache", "_phone_cache", "_sheets_sink", "_chatwork_dispatcher"):
+            monkeypatch.setattr(main, name, None)
+        restart(server)
+        main.main()  # 初回（全店舗をスプシへ、起動完了の通知）
+        yield server
+
+
+def is_known(salon_id: str) -> bool:
+    known = main.load_known_salons()
+    try:
+        return main.salon_number(salon_id) in known
+    finally:
+        if isinstance(known, main.SalonStore):
+            known.close()
+
+
+def bodies(server, start: int) -> str:
+    return "\n".join(message["body"] for message in server.messages[start:])
+
+
+def test_failed_notification_is_resent_next_run(server, monkeypatch):
+    ids = server.publish("svcSA", 2)
+    sent = len(server.messages)
+    with monkeypatch.context() as m:
+        m.setattr(main.ChatworkDispatcher, "post", lambda self, message: False)
+        main.main()
+    restart(server)
+    assert len(server.messages) == sent
+    # 送れなかった店舗は既知にせず、進捗ログに残す
+    assert os.path.exists(main.JOURNAL_FILE)
+    assert not any(is_known(salon_id) for salon_id in ids)
+
+    main.main()
+    restart(server)
+    assert len(server.messages) == sent + 1
+    assert all(salon_id in bodies(server, sent) for salon_id in ids)
+    assert not os.path.exists(main.JOURNAL_FILE)
+    assert all(is_known(salon_id) for salon_id in ids)
+    # スプシは1回目で追加済みなので二重に書かない
+    assert sum(row[0] in ids for row in server.sheet_rows) == 2
+
+    main.main()
+    assert len(server.messages) == sent + 1
+
+
+def test_failed_sheet_rows_are_retried_without_renotifying(server, monkeypatch):
+    ids = server.publish("svcSB", 3)
+    sent = len(server.messages)
+    with monkeypatch.context() as m:
+        m.setattr(bench.StandInWorksheet, "append_rows", fail_append)
+        main.main()
+    assert not any(row[0] in ids for row in server.sheet_rows)
+    assert len(server.messages) == sent + 1
+    assert not any(is_known(salon_id) for salon_id in ids)
+
+    # バッファに残った行はプロセスとともに消えても、進捗ログから送り直す
+    restart(server)
+    main.main()
+    assert sorted(row[0] for row in server.sheet_rows if row[0] in ids) == sorted(ids)
+    assert len(server.messages) == sent + 1
+    assert not os.path.exists(main.JOURNAL_FILE)
+    assert all(is_known(salon_id) for salon_id in ids)
+
+
+def test_journal_keeps_only_unfinished_salons(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = main.RunJournal(path)
+    done = main.Salon.from_dict({"id": "slnH000000001", "name": "A", "area": "関東", "genre": "ヘア", "phone": "03"})
+    half = main.Salon.from_dict({"id": "slnH000000002", "name": "B", "area": "関東", "genre": "ヘア", "phone": ""})
+    for salon in (done, half):
+        journal.record(salon, "hair_svcSA")
+    journal.mark("sheet", [done, half])
+    journal.mark("notify", [done])
+
+    current = {"hair_svcSA": [done, half]}
+    journal.fold_into(current)
+    assert [salon.id for salon in current["hair_svcSA"]] == [done.id]
+    assert journal.close() == 1
+
+    reopened = main.RunJournal(path)
+    assert [(key, salon.id) for key, salon in reopened.resumable()] == [("hair_svcSA", half.id)]
+    assert reopened.pending("sheet", [half]) == []
+    assert reopened.pending("notify", [half]) == [half]
+    reopened.mark("notify", [half])
+    assert reopened.close() == 0
+    assert not os.path.exists(path)
+
+
+def test_failed_cycle_releases_journal_and_stops_threads(server, monkeypatch):
+    server.publish("svcSA", 1)
+    server.pages, server.latency = 20, 0.05  # 全エリアを取り終えるには数秒かかる
+    journals = []
+
+    def fail_record(self, salon, key):
+        journals.append(self)
+        raise RuntimeError("記録できない")
+
+    monkeypatch.setattr(main.RunJournal, "record", fail_record)
+    with pytest.raises(RuntimeError):
+        main.main()
+    # 常駐モードで次のサイクルへ進んでも、ファイルハンドルと取得スレッドを残さない
+    assert journals and journals[0].file.closed
+    for thread in threading.enumerate():
+        if thread.name == "phone-feed":
+            thread.join(timeout=2)
+            assert not thread.is_alive()
+    requests_after = server.requests
+    time.sleep(0.3)
+    assert server.requests == requests_after
+
+
+def test_resumed_salons_are_not_counted_again_in_arrival_rate(server, monkeypatch):
+    server.publish("svcSA", 2)
+    with monkeypatch.context() as m:
+        m.setattr(main.ChatworkDispatcher, "post", lambda self, message: False)
+        main.main()
+    restart(server)
+    assert main.load_scan_state()["areas"]["hair_svcSA"]["new"] == pytest.approx(2, abs=0.01)
+
+    main.main()  # 進捗ログの2件を送り直す（今回のスキャンで新たに見つけたわけではない）
+    assert main.load_scan_state()["areas"]["hair_svcSA"]["new"] == pytest.approx(2, abs=0.01)
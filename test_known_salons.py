@@ -0,0 +1,103 @@
+"""既知店舗の差分（SalonIndex / SalonStore）を同じシナリオで検証"""
+
+import pytest
+
+import main
+
+A, B = "hair_svcSA", "hair_svcSB"
+T0 = 1_700_000_000.0
+DAY = 86400.0
+
+
+def salon(n: int, name: str = "") -> main.Salon:
+    return main.Salon(n, name or f"サロン{n}")
+
+
+@pytest.fixture(params=["index", "store"])
+def known(request, tmp_path):
+    if request.param == "index":
+        yield main.SalonIndex()
+    else:
+        store = main.SalonStore(str(tmp_path / "salons.db"))
+        yield store
+        store.close()
+
+
+def kinds(events):
+    """保存形式によらず同じになる部分（種類・エリア・店舗ID）"""
+    return sorted((event.kind, event.key, event.salon_id) for event in events)
+
+
+def names(known, events):
+    """店舗名（SalonIndex は掲載されていない店舗の名前と変更前の名前を持たない）"""
+    return {(event.kind, event.salon_id): (event.name, event.old_name) for event in events}
+
+
+def test_added(known):
+    events = known.apply({A: [salon(1), salon(2)], B: [salon(2)]}, now=T0)
+    assert kinds(events) == [("added", A, "slnH000000001"), ("added", A, "slnH000000002"),
+                             ("added", B, "slnH000000002")]
+    assert all(event.name for event in events)
+    assert 1 in known and 2 in known and 3 not in known
+    assert [s.id for s in known.find_new({A: [salon(2), salon(3)], B: [salon(3)]})] == ["slnH000000003"]
+
+
+def test_moved_between_areas(known):
+    known.apply({A: [salon(1), salon(2)]}, now=T0)
+    events = known.apply({A: [salon(2)], B: [salon(1)]}, complete_keys={A, B}, now=T0 + 60)
+    assert kinds(events) == [("added", B, "slnH000000001"), ("removed", A, "slnH000000001")]
+    # 別エリアに載っている店舗は、どちらの保存形式でも名前が入る
+    assert names(known, events)[("removed", "slnH000000001")][0] == "サロン1"
+
+
+def test_removed_only_when_area_scan_is_complete(known):
+    known.apply({A: [salon(1), salon(2)]}, now=T0)
+    # 差分スキャンで打ち切った（complete_keys にない）エリアでは、見えない店舗を掲載終了にしない
+    assert known.apply({A: [salon(1)]}, now=T0 + 60) == []
+    events = known.apply({A: [salon(1)]}, complete_keys={A}, now=T0 + 120)
+    assert kinds(events) == [("removed", A, "slnH000000002")]
+    expected = "" if isinstance(known, main.SalonIndex) else "サロン2"
+    assert names(known, events)[("removed", "slnH000000002")] == (expected, "")
+    # 掲載終了しても既知のまま（新規として通知しない）
+    assert 2 in known
+    assert known.apply({A: [salon(1)]}, complete_keys={A}, now=T0 + 180) == []
+
+
+def test_relisted(known):
+    known.apply({A: [salon(1), salon(2)]}, now=T0)
+    known.apply({A: [salon(1)]}, complete_keys={A}, now=T0 + 60)
+    events = known.apply({B: [salon(2)]}, now=T0 + 120)
+    assert kinds(events) == [("relisted", B, "slnH000000002")]
+    assert known.find_new({B: [salon(2)]}) == []
+
+
+def test_renamed(known):
+    known.apply({A: [salon(1, "旧店名")]}, now=T0)
+    events = known.apply({A: [salon(1, "新店名")]}, now=T0 + 60)
+    assert kinds(events) == [("renamed", A, "slnH000000001")]
+    expected = "" if isinstance(known, main.SalonIndex) else "旧店名"
+    assert names(known, events)[("renamed", "slnH000000001")] == ("新店名", expected)
+    assert known.apply({A: [salon(1, "新店名")]}, now=T0 + 120) == []
+
+
+def test_ttl_expiry(known):
+    known.apply({A: [salon(1), salon(2), salon(3)]}, now=T0)
+    known.apply({A: [salon(2)]}, complete_keys={A}, now=T0 + 50 * DAY)
+    known.apply({A: [salon(2)], B: [salon(3)]}, now=T0 + 80 * DAY)
+    # 店舗3は A では古くても B で最近見ているので残す（件数は行ではなく店舗で数える）
+    assert known.expire(T0 + 30 * DAY) == 1
+    assert 1 not in known and 2 in known and 3 in known
+    assert known.expire(T0 + 30 * DAY) == 0
+    # 期限切れで消えた店舗は新規扱い
+    assert [s.id for s in known.find_new({A: [salon(1)]})] == ["slnH000000001"]
+
+
+def test_complete_scan_keys():
+    current = {A: [salon(1)], B: [salon(2)], "hair_svcSC": [], "hair_svcSD": [salon(4)]}
+    stats = {
+        A: {"pages": 3, "total_pages": 3},
+        B: {"pages": 1, "total_pages": 3},  # 差分スキャンで打ち切り
+        "hair_svcSC": {"pages": 1, "total_pages": 1},  # 0件（ページ構成の変化を疑う）
+        "hair_svcSD": {"pages": 2, "total_pages": 2, "skipped": 1},  # 取得失敗のページあり
+    }
+    assert main.complete_scan_keys(stats, current) == {A}
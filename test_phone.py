@@ -7,11 +7,12 @@
 import requests
 from bs4 import BeautifulSoup
 import csv
-import time
 import re
 from datetime import datetime
 from typing import Dict, List
 
+from main import fetch_page  # 共有HTTPクライアント（プール・リトライ・レート制限）
+
 # ============================================
 # 設定
 # ============================================
@@ -19,9 +20,7 @@ from typing import Dict, List
 CHATWORK_API_TOKEN = "07a5b6d533a6ef46e8f1e29ed1f97691"
 CHATWORK_ROOM_ID = "418568359"
 
-REQUEST_DELAY = 1.0  # リクエスト間隔（秒）
 MAX_SALONS = 20  # テスト用に20店舗のみ
-USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
 # 関東の美容室のみ
 TEST_URL = "https://beauty.hotpepper.jp/svcSA/spkSP13_spdL035/"
@@ -31,17 +30,6 @@ TEST_URL = "https://beauty.hotpepper.jp/svcSA/spkSP13_spdL035/"
 # スクレイピング
 # ============================================
 
-def fetch_page(url: str) -> str | None:
-    headers = {"User-Agent": USER_AGENT}
-    try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return response.text
-    except Exception as e:
-        print(f"[ERROR] {url}: {e}")
-        return None
-
-
 def extract_salons_from_list(html: str, max_count: int) -> List[Dict]:
     """一覧ページから店舗情報を抽出"""
     soup = BeautifulSoup(html, "html.parser")
@@ -184,7 +172,6 @@ def main():
         phone = get_phone_number(salon["tel_url"])
         salon["phone"] = phone
         print(f"→ {phone if phone else 'なし'}")
-        time.sleep(REQUEST_DELAY)
     
     # 3. CSV出力
     print("\n[3] CSV出力...")
@@ -0,0 +1,43 @@
+"""出力先へのまとめ送り（iter_batches）のテスト"""
+
+import queue
+import threading
+import time
+
+import main
+
+
+def feed(items: queue.Queue, schedule):
+    """(秒, 件数) の順にキューへ入れ、最後に _END"""
+    def run():
+        count = 0
+        for delay, n in schedule:
+            time.sleep(delay)
+            for _ in range(n):
+                items.put(count)
+                count += 1
+        items.put(main._END)
+    threading.Thread(target=run, daemon=True).start()
+
+
+def test_first_batch_is_sent_quickly_and_later_ones_are_merged():
+    items: queue.Queue = queue.Queue()
+    # 0.1秒ごとに1件ずつ12件（電話番号の取得ペースで新規店舗が流れてくる）
+    feed(items, [(0.1, 1)] * 12)
+    started = time.monotonic()
+    batches = []
+    for batch in main.iter_batches(items, 50, 0.5, first_seconds=0.05):
+        batches.append((time.monotonic() - started, batch))
+    # 1通目は最初の1件だけですぐ、残りは 0.5秒ごとにまとめる（1件ずつ12通にはならない）
+    assert batches[0][1] == [0] and batches[0][0] < 0.3
+    assert len(batches) <= 5
+    assert [item for _, batch in batches for item in batch] == list(range(12))
+
+
+def test_batch_size_and_end_flush():
+    items: queue.Queue = queue.Queue()
+    for i in range(7):
+        items.put(i)
+    items.put(main._END)
+    # 待たなくても、すでに届いている分は size 件までまとめる。_END で残りを返して終わる
+    assert list(main.iter_batches(items, 3, 60, first_seconds=0)) == [[0, 1, 2], [3, 4, 5], [6]]
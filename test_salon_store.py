@@ -0,0 +1,91 @@
+"""SalonStore（既定の STATE_BACKEND=sqlite）の移行・差分・更新・期限切れのテスト"""
+
+import json
+import time
+
+import pytest
+
+import main
+
+A, B = "hair_svcSA", "hair_svcSB"
+T0 = 1_700_000_000.0
+DAY = 86400.0
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = main.SalonStore(str(tmp_path / "salons.db"))
+    yield store
+    store.close()
+
+
+def rows(store, salon_id):
+    return store.conn.execute(
+        "SELECT area_key, name, phone, status FROM salons WHERE id = ? ORDER BY area_key", (salon_id,)).fetchall()
+
+
+def test_migrates_known_salons_json_on_first_load(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "STATE_BACKEND", "sqlite")
+    with open(main.DATA_FILE, "w", encoding="utf-8") as f:
+        json.dump({A: ["slnH000000001", "slnH000000002"], B: ["slnH000000002"], "hair_svcSC": []}, f)
+
+    store = main.load_known_salons()
+    try:
+        assert isinstance(store, main.SalonStore)
+        assert len(store) == 3  # エリアごとの行
+        assert "slnH000000001" in store and 2 in store and 3 not in store
+        assert rows(store, "slnH000000002") == [(A, None, None, "active"), (B, None, None, "active")]
+    finally:
+        store.close()
+
+    # 2回目以降は移行し直さない（JSON に後から足された店舗は取り込まない）
+    with open(main.DATA_FILE, "w", encoding="utf-8") as f:
+        json.dump({A: ["slnH000000009"]}, f)
+    store = main.load_known_salons()
+    try:
+        assert len(store) == 3 and 9 not in store
+    finally:
+        store.close()
+
+
+def test_migrated_salons_are_not_new_and_expire_from_migration(store, tmp_path):
+    path = tmp_path / "known_salons.json"
+    path.write_text(json.dumps({A: ["slnH000000001"]}), encoding="utf-8")
+    assert store.import_json(str(path)) == 1
+    assert store.find_new({A: [main.Salon(1, "サロン1")]}) == []
+    # 最終確認の無い移行行は、最初の期限切れ判定の時点から数え始める
+    assert store.expire(time.time() - DAY) == 0
+    assert 1 in store
+
+
+def test_find_new_across_areas(store):
+    store.apply({A: [main.Salon(1, "サロン1")]}, now=T0)
+    current = {
+        A: [main.Salon(2, "サロン2"), main.Salon(3, "サロン3")],
+        B: [main.Salon(1, "サロン1"), main.Salon(2, "サロン2")],  # 1 は A で既知、2 は今回 A にも載っている
+    }
+    assert [salon.id for salon in store.find_new(current)] == ["slnH000000002", "slnH000000003"]
+    assert store.find_new({}) == []
+
+
+def test_upsert_keeps_phone_and_reactivates(store):
+    store.apply({A: [main.Salon(1, "サロン1", phone="03-1111-2222")]}, now=T0)
+    # 一覧からの行は電話番号を持たないが、記録済みの電話番号は消さない
+    store.apply({A: [main.Salon(1, "サロン1")]}, now=T0 + 60)
+    assert rows(store, "slnH000000001") == [(A, "サロン1", "03-1111-2222", "active")]
+
+    store.apply({A: []}, complete_keys={A}, now=T0 + 120)
+    assert rows(store, "slnH000000001") == [(A, "サロン1", "03-1111-2222", "removed")]
+    # 新しい電話番号・店舗名は上書きし、掲載終了から戻す
+    events = store.apply({A: [main.Salon(1, "新サロン1", phone="03-3333-4444")]}, now=T0 + 180)
+    assert [(event.kind, event.key) for event in events] == [("relisted", A), ("renamed", A)]
+    assert rows(store, "slnH000000001") == [(A, "新サロン1", "03-3333-4444", "active")]
+
+
+def test_expire_uses_latest_sighting_in_any_area(store):
+    store.apply({A: [main.Salon(1, "サロン1"), main.Salon(2, "サロン2")]}, now=T0)
+    store.apply({B: [main.Salon(2, "サロン2")]}, now=T0 + 60 * DAY)
+    assert store.expire(T0 + 30 * DAY) == 1
+    assert 1 not in store
+    assert [row[0] for row in rows(store, "slnH000000002")] == [A, B]
@@ -0,0 +1,70 @@
+"""PollScheduler（差分スキャン時のエリア選択）のテスト"""
+
+import main
+from main import PollScheduler
+
+KEYS = ["hair_svcSA", "hair_svcSB", "hair_svcSC"]
+T0 = 1_700_000_000.0
+MINUTE = 60.0
+HOUR = 3600.0
+
+
+def first_run(scheduler: PollScheduler, now: float = T0):
+    """初回実行（全件スキャン。全店舗が新規に見えるので観測には数えない）"""
+    for key in KEYS:
+        scheduler.record_scan(key, None, 3, now)
+
+
+def test_areas_without_history_are_due_every_cycle():
+    scheduler = PollScheduler({})
+    assert scheduler.select(KEYS, T0) == KEYS
+
+    first_run(scheduler)
+    # 到着率を 0 として扱うと次の確認は POLL_MAX_INTERVAL_MIN 後になってしまう
+    assert scheduler.select(KEYS, T0 + MINUTE) == KEYS
+
+
+def test_rate_is_seeded_from_first_observation():
+    scheduler = PollScheduler({})
+    first_run(scheduler)
+    # 1時間半、毎分確認して「関東」だけ 1時間あたり2件のペースで新規掲載
+    now = T0
+    for minute in range(1, 91):
+        now = T0 + minute * MINUTE
+        for key in KEYS:
+            scheduler.record_scan(key, 1 if key == "hair_svcSA" and minute % 30 == 0 else 0, 1, now)
+
+    busy = scheduler.areas["hair_svcSA"]
+    assert abs(PollScheduler.rate(busy) - 2.0) < 0.05
+    # 見込み新規数が POLL_TARGET_NEW（0.5件）に届く 15分後には確認対象になる
+    assert scheduler.select(KEYS, now + 10 * MINUTE) == []
+    assert scheduler.select(KEYS, now + 16 * MINUTE) == ["hair_svcSA"]
+    # 新規のないエリアは最大間隔で確認される
+    assert set(scheduler.select(KEYS, now + main.POLL_MAX_INTERVAL_MIN * MINUTE)) == set(KEYS)
+
+
+def test_budget_limits_areas_without_history():
+    scheduler = PollScheduler({"requests": [[T0, main.POLL_BUDGET_PER_HOUR - 1]]})
+    first_run(scheduler)
+    # 残り予算 1リクエスト（推定3ページ）では選ばない
+    assert scheduler.select(KEYS, T0 + MINUTE) == []
+
+
+
+def test_full_sweep_waits_for_budget():
+    state = {}
+    scheduler = PollScheduler(state)
+    assert scheduler.can_sweep(T0)  # 前回の全件スキャンの記録がなければ行う
+    scheduler.record_sweep(400)
+    scheduler.record_requests(300, T0)
+    assert not scheduler.can_sweep(T0 + MINUTE)
+    assert scheduler.can_sweep(T0 + HOUR + MINUTE)
+    assert PollScheduler(state).can_sweep(T0 + HOUR + MINUTE)  # scan_state に保存される
+
+
+def test_oversized_full_sweep_runs_only_in_an_idle_hour():
+    scheduler = PollScheduler({})
+    scheduler.record_sweep(main.POLL_BUDGET_PER_HOUR * 2)
+    assert scheduler.can_sweep(T0)
+    scheduler.record_requests(1, T0)
+    assert not scheduler.can_sweep(T0 + MINUTE)
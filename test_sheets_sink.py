@@ -0,0 +1,142 @@
+"""SheetsSink（スプシ書き込み・A列ミラー・重複除外・再試行）を偽のワークシートでテスト"""
+
+import json
+
+import gspread
+import pytest
+import requests
+
+import main
+
+
+def api_error(status: int) -> gspread.exceptions.APIError:
+    response = requests.Response()
+    response.status_code = status
+    return gspread.exceptions.APIError(response)
+
+
+class FakeWorksheet:
+    """gspread の Worksheet のうち SheetsSink が使う呼び出しだけを持つ（呼び出しを記録、失敗も注入できる）"""
+
+    def __init__(self, rows=None):
+        self.rows = [list(main.SHEET_HEADERS)] + [list(row) for row in rows or []]
+        self.calls = []
+        self.failures = []  # append_rows で順に送出する例外
+
+    def append_rows(self, rows):
+        self.calls.append(("append_rows", len(rows)))
+        if self.failures:
+            raise self.failures.pop(0)
+        self.rows.extend(list(row) for row in rows)
+
+    def col_values(self, col):
+        self.calls.append(("col_values", col))
+        return [row[col - 1] for row in self.rows]
+
+    def batch_get(self, ranges):
+        self.calls.append(("batch_get", tuple(ranges)))
+        result = []
+        for cell_range in ranges:
+            start, _, end = cell_range.partition(":")
+            first = int(start[1:]) - 1
+            rows = self.rows[first:] if end else self.rows[first:first + 1]
+            result.append([[row[0]] for row in rows])
+        return result
+
+    def ids(self):
+        return [row[0] for row in self.rows[1:]]
+
+
+def salon(n: int) -> main.Salon:
+    return main.Salon(n, f"サロン{n}", "関東", "ヘアサロン", "03-0000-0000")
+
+
+@pytest.fixture
+def sink_for(tmp_path, monkeypatch):
+    """偽のワークシートにつないだ SheetsSink を作る（A列ミラーは tmp_path に保存）"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "SHEET_RETRY_BACKOFF", 0.0)
+    monkeypatch.setattr(main, "_metrics", None)
+
+    def make(worksheet: FakeWorksheet) -> main.SheetsSink:
+        sink = main.SheetsSink()
+        sink.worksheet = worksheet
+        monkeypatch.setattr(main, "_sheets_sink", sink)
+        return sink
+
+    return make
+
+
+def test_rows_are_appended_and_mirrored(sink_for):
+    worksheet = FakeWorksheet()
+    sink = sink_for(worksheet)
+    assert main.append_salons_to_sheet([salon(1), salon(2)])
+    assert worksheet.ids() == ["slnH000000001", "slnH000000002"]
+    assert worksheet.rows[1][:3] == ["slnH000000001", "サロン1", "03-0000-0000"]
+
+    sink.save_index()
+    with open(main.SHEET_INDEX_FILE, encoding="utf-8") as f:
+        mirror = json.load(f)
+    assert mirror["rows"] == 3 and mirror["last"] == "slnH000000002"
+    assert mirror["ids"] == ["slnH000000001", "slnH000000002"]
+
+
+def test_mirror_reads_only_new_rows_and_skips_existing_ids(sink_for):
+    worksheet = FakeWorksheet([["slnH000000001"]])
+    sink_for(worksheet).flush()
+    main._sheets_sink.save_index()
+
+    # 別のプロセスが追記した行も、ミラーより後ろだけ読んで重複を避ける
+    worksheet.rows.append(["slnH000000002"])
+    worksheet.calls.clear()
+    sink = sink_for(worksheet)
+    assert main.append_salons_to_sheet([salon(1), salon(2), salon(3), salon(3)])
+    assert worksheet.ids() == ["slnH000000001", "slnH000000002", "slnH000000003"]
+    assert ("col_values", 1) not in worksheet.calls
+    assert worksheet.calls[0] == ("batch_get", ("A2", "A3:A"))
+    assert sink.index_ids == {"slnH000000001", "slnH000000002", "slnH000000003"}
+
+
+def test_mirror_is_rebuilt_when_rows_are_deleted(sink_for):
+    worksheet = FakeWorksheet([["slnH000000001"], ["slnH000000002"]])
+    sink_for(worksheet).flush()
+    main._sheets_sink.save_index()
+
+    del worksheet.rows[1:]
+    sink = sink_for(worksheet)
+    assert main.append_salons_to_sheet([salon(2)])
+    assert ("col_values", 1) in worksheet.calls
+    assert worksheet.ids() == ["slnH000000002"]
+    assert sink.index_rows == 2
+
+
+def test_transient_errors_are_retried(sink_for):
+    worksheet = FakeWorksheet()
+    worksheet.failures = [api_error(429), api_error(503)]
+    sink_for(worksheet)
+    assert main.append_salons_to_sheet([salon(1)])
+    assert worksheet.ids() == ["slnH000000001"]
+    assert [call for call in worksheet.calls if call[0] == "append_rows"] == [("append_rows", 1)] * 3
+
+
+def test_failed_rows_stay_buffered_and_are_sent_once(sink_for, monkeypatch):
+    monkeypatch.setattr(main, "SHEET_RETRIES", 1)
+    worksheet = FakeWorksheet()
+    worksheet.failures = [api_error(503), api_error(503)]
+    sink = sink_for(worksheet)
+    assert not main.append_salons_to_sheet([salon(1), salon(2)])
+    assert worksheet.ids() == []
+    assert [row[0] for row in sink.rows] == ["slnH000000001", "slnH000000002"]
+
+    # 次の呼び出し（進捗ログからの送り直しで同じ店舗がまた来る）でも1回だけ書く
+    assert main.append_salons_to_sheet([salon(1), salon(2)])
+    assert worksheet.ids() == ["slnH000000001", "slnH000000002"]
+    assert sink.rows == []
+
+
+def test_non_retryable_error_is_not_retried(sink_for):
+    worksheet = FakeWorksheet()
+    worksheet.failures = [api_error(400)]
+    sink_for(worksheet)
+    assert not main.append_salons_to_sheet([salon(1)])
+    assert [call for call in worksheet.calls if call[0] == "append_rows"] == [("append_rows", 1)]
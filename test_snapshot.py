@@ -0,0 +1,90 @@
+"""既知店舗のバイナリスナップショット（STATE_BACKEND=snapshot）のテスト"""
+
+import os
+
+import pytest
+
+import main
+
+T0 = 1_700_000_000
+
+
+def make_index() -> main.SalonIndex:
+    index = main.SalonIndex()
+    index.apply({
+        "hair_svcSA": [main.Salon(1, "サロン1"), main.Salon(123456789, "サロン2")],
+        "hair_svcSB": [main.Salon(123456789, "サロン2"), main.Salon(5, "")],
+    }, now=T0)
+    index.apply({"hair_svcSB": [main.Salon(123456789, "サロン2")]}, complete_keys={"hair_svcSB"}, now=T0 + 7200)
+    return index
+
+
+def columns(index: main.SalonIndex):
+    return (index.area_keys, list(index.ids), list(index.masks), list(index.seen), list(index.digests))
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = str(tmp_path / "known_salons.bin")
+    main.write_snapshot(path, make_index())
+    return path
+
+
+def test_round_trip(snapshot):
+    assert columns(main.read_snapshot(snapshot)) == columns(make_index())
+
+
+def test_empty_index_round_trip(tmp_path):
+    path = str(tmp_path / "empty.bin")
+    main.write_snapshot(path, main.SalonIndex())
+    assert len(main.read_snapshot(path)) == 0
+
+
+def test_crc_mismatch_is_rejected(snapshot):
+    with open(snapshot, "rb") as f:
+        data = bytearray(f.read())
+    data[-1] ^= 0xFF
+    with open(snapshot, "wb") as f:
+        f.write(data)
+    with pytest.raises(ValueError, match="破損"):
+        main.read_snapshot(snapshot)
+
+
+@pytest.mark.parametrize("keep", [len(main.SNAPSHOT_MAGIC), main.SNAPSHOT_HEADER.size - 1,
+                                  main.SNAPSHOT_HEADER.size, main.SNAPSHOT_HEADER.size + 5, -1])
+def test_truncated_file_is_rejected(snapshot, keep):
+    with open(snapshot, "rb") as f:
+        data = f.read()
+    with open(snapshot, "wb") as f:
+        f.write(data[:keep])
+    with pytest.raises(ValueError):
+        main.read_snapshot(snapshot)
+
+
+def test_unknown_version_is_rejected(snapshot):
+    with open(snapshot, "rb") as f:
+        data = bytearray(f.read())
+    data[len(main.SNAPSHOT_MAGIC)] = main.SNAPSHOT_VERSION + 1
+    with open(snapshot, "wb") as f:
+        f.write(data)
+    with pytest.raises(ValueError, match="バージョン"):
+        main.read_snapshot(snapshot)
+
+
+def test_corrupt_snapshot_is_set_aside_and_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "STATE_BACKEND", "snapshot")
+    main.write_snapshot(main.SNAPSHOT_FILE, make_index())
+    with open(main.SNAPSHOT_FILE, "r+b") as f:
+        f.truncate(10)
+    # 古い JSON が残っていても戻さない（その後の新規店舗を一斉に通知しないよう初回扱いにする）
+    main.atomic_write_json(main.DATA_FILE, {"hair_svcSA": ["slnH000000001"]})
+
+    known = main.load_known_salons()
+    assert isinstance(known, main.SalonIndex) and len(known) == 0
+    assert not os.path.exists(main.SNAPSHOT_FILE)
+    assert os.path.exists(f"{main.SNAPSHOT_FILE}.corrupt")
+
+    known.apply({"hair_svcSA": [main.Salon(1, "サロン1")]}, now=T0)
+    main.save_known_salons(known)
+    assert columns(main.load_known_salons()) == columns(known)
@@ -0,0 +1,16 @@
+"""main の起動時に重いモジュール（パーサ・Google 認証）を読み込んでいないことのテスト"""
+
+import bench
+
+
+def test_main_import_is_lazy():
+    # import 時間は環境で揺れるので上限は見ない（bench.py --startup で確認）
+    result = bench.bench_startup(1, float("inf"))
+    assert result["eager_imports"] == []
+    assert result["import_ms_min"] > 0
+
+
+def test_import_times_sees_imported_modules():
+    # 読み込んだモジュールを拾えていること（eager_imports が空振りしていないこと）
+    modules = bench.import_times(1)["modules"]
+    assert "main" in modules and "requests" in modules